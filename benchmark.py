@@ -0,0 +1,318 @@
+"""Benchmarks for the scan/copy pipeline that run without a device
+
+Usage:
+    python benchmark.py make-tree <dir> [--count 100000]
+    python benchmark.py scan <dir> [--workers 4] [--index scan_index.db]
+    python benchmark.py catalog <dir>
+    python benchmark.py dates [--count 100000] [--unique 500]
+    python benchmark.py make-media <dir> [--count 300] [--payload-size 8388608]
+    python benchmark.py media-dates <dir>
+"""
+import argparse
+import os
+import random
+import struct
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from typing import Optional
+
+from catalog import PhotoCatalog
+from dateparse import parse_date
+from device_source import LocalDeviceSource, is_photo_file
+from engine import HACHOIR_AVAILABLE, hachoir_date
+from media_dates import read_file_date
+from scan_index import ScanIndex
+from scanner import PhotoScanner
+
+
+EXTENSIONS = ['.HEIC', '.HEIC', '.HEIC', '.JPG', '.PNG', '.MOV', '.MP4']
+
+
+def create_synthetic_dcim(root: str, count: int, files_per_folder: int = 1000,
+                          file_size: int = 4096, seed: int = 0) -> Path:
+    """Create a DCIM-style tree of small synthetic files under root
+
+    Layout mirrors an iPhone seen through the Shell:
+    ``root/Internal Storage/DCIM/100APPLE/IMG_0001.HEIC`` for classic
+    folders and ``202410__/`` style folders for newer iOS versions.
+    """
+    rng = random.Random(seed)
+    dcim = Path(root) / "Internal Storage" / "DCIM"
+    start = datetime(2019, 1, 1)
+    payload = bytes(rng.getrandbits(8) for _ in range(file_size))
+
+    for n in range(count):
+        folder_idx = n // files_per_folder
+        if folder_idx % 2 == 0:
+            folder = dcim / f"{100 + folder_idx // 2}APPLE"
+        else:
+            month = start + timedelta(days=31 * (folder_idx // 2))
+            folder = dcim / f"{month.strftime('%Y%m')}__"
+        if n % files_per_folder == 0:
+            folder.mkdir(parents=True, exist_ok=True)
+
+        name = f"IMG_{n % 10000:04d}{rng.choice(EXTENSIONS)}"
+        path = folder / name
+        with open(path, 'wb') as f:
+            f.write(payload)
+
+        taken = start + timedelta(minutes=37 * n)
+        os.utime(path, (taken.timestamp(), taken.timestamp()))
+
+    return dcim
+
+
+def bench_scan(root: str, workers: int = 4, index_path: Optional[str] = None):
+    """Time scanning (enumerate + stat) of a local source"""
+    source = LocalDeviceSource(root)
+    index = ScanIndex(index_path) if index_path else None
+
+    t0 = time.perf_counter()
+    first = None
+    count = 0
+    for storage in source.list_storages():
+        if not storage.is_folder:
+            continue
+        view = index.view(source.name, storage.path) if index else None
+        scanner = PhotoScanner(source, log=lambda message, level=None: None, workers=workers, index=view)
+        for _ in scanner.iter_photos(storage):
+            if first is None:
+                first = time.perf_counter() - t0
+            count += 1
+    elapsed = time.perf_counter() - t0
+
+    if index:
+        index.close()
+
+    print(f"scan: {count} photos in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f}/s), "
+          f"first record after {(first or 0) * 1000:.1f} ms")
+
+
+def bench_catalog(root: str):
+    """Memory held by the loaded photo list: scanned dicts vs the columnar catalog"""
+    def load(keep):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        source = LocalDeviceSource(root)
+        for storage in source.list_storages():
+            if storage.is_folder:
+                for record in PhotoScanner(source, log=lambda message, level=None: None).iter_photos(storage):
+                    keep(record)
+        elapsed = time.perf_counter() - t0
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, current, peak
+
+    records = []
+    elapsed, current, peak = load(records.append)
+    count = len(records)
+    print(f"dicts:   {count} photos in {elapsed:.2f}s, {current / 1e6:.1f} MB held "
+          f"({current / max(count, 1):.0f} B/photo), peak {peak / 1e6:.1f} MB")
+    del records
+
+    catalog = PhotoCatalog()
+    elapsed, current, peak = load(catalog.append)
+    count = len(catalog)
+    print(f"catalog: {count} photos in {elapsed:.2f}s, {current / 1e6:.1f} MB held "
+          f"({current / max(count, 1):.0f} B/photo), peak {peak / 1e6:.1f} MB")
+
+
+def legacy_parse_date(date_detail: str):
+    """The strptime cascade parse_date replaced, kept for comparison"""
+    date_formats = [
+        "%m/%d/%Y %I:%M %p", "%m/%d/%Y %I:%M:%S %p",
+        "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S",
+        "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S",
+        "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d", "%Y-%m-%d",
+        "%d-%m-%Y", "%m-%d-%Y", "%Y%m%d",
+        "%-m/%-d/%Y %-I:%M %p", "%-m/%-d/%Y",
+    ]
+    for fmt in date_formats:
+        try:
+            return datetime.strptime(date_detail, fmt)
+        except:
+            continue
+    return None
+
+
+def bench_dates(count: int, unique: int):
+    """Compare parse_date with the old strptime cascade (strings/second)"""
+    rng = random.Random(0)
+    start = datetime(2019, 1, 1)
+    pool = []
+    for n in range(unique):
+        dt = start + timedelta(minutes=rng.randrange(60 * 24 * 365 * 5))
+        style = n % 3
+        if style == 0:
+            pool.append(f"{dt.month}/{dt.day}/{dt.year} {dt.strftime('%I:%M %p')}")
+        elif style == 1:
+            pool.append(dt.strftime("%d/%m/%Y %H:%M"))
+        else:
+            pool.append(dt.strftime("%Y-%m-%d %H:%M:%S"))
+    strings = [rng.choice(pool) for _ in range(count)]
+
+    def run(label, func):
+        t0 = time.perf_counter()
+        for text in strings:
+            func(text)
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<22} {count / max(elapsed, 1e-9):>12,.0f} strings/s")
+
+    run("strptime cascade", legacy_parse_date)
+    parse_date.cache_clear()
+    run("parse_date (cold)", parse_date.__wrapped__)
+    run("parse_date (cached)", parse_date)
+
+
+def _box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+
+def _exif_tiff(taken: datetime) -> bytes:
+    """Minimal little-endian TIFF block: IFD0 -> Exif IFD -> DateTimeOriginal"""
+    text = taken.strftime("%Y:%m:%d %H:%M:%S").encode('ascii') + b'\x00'
+    ifd0 = struct.pack('<H', 1) + struct.pack('<HHII', 0x8769, 4, 1, 26) + struct.pack('<I', 0)
+    exif = struct.pack('<H', 1) + struct.pack('<HHII', 0x9003, 2, len(text), 44) + struct.pack('<I', 0)
+    return b'II' + struct.pack('<HI', 42, 8) + ifd0 + exif + text
+
+
+def _segment(marker: int, payload: bytes) -> bytes:
+    return struct.pack('>BBH', 0xFF, marker, len(payload) + 2) + payload
+
+
+def _synthetic_jpeg(taken: datetime, payload: bytes) -> bytes:
+    """Baseline JPEG (8x8 grayscale frame) with EXIF; the filler is the scan data"""
+    app1 = _segment(0xE1, b'Exif\x00\x00' + _exif_tiff(taken))
+    dqt = _segment(0xDB, b'\x00' + bytes([1]) * 64)
+    sof0 = _segment(0xC0, struct.pack('>BHHB', 8, 8, 8, 1) + bytes([1, 0x11, 0]))
+    # One-code DC and AC Huffman tables
+    dht = _segment(0xC4, b'\x00' + bytes([1]) + bytes(15) + b'\x00' + b'\x10' + bytes([1]) + bytes(15) + b'\x00')
+    sos = _segment(0xDA, bytes([1, 1, 0x00, 0, 63, 0]))
+    # 0xFF in scan data is followed by a stuffed zero byte
+    scan = payload.replace(b'\xff', b'\xff\x00')
+    return b'\xff\xd8' + app1 + dqt + sof0 + dht + sos + scan + b'\xff\xd9'
+
+
+def _synthetic_heic(taken: datetime, payload: bytes) -> bytes:
+    exif_item = struct.pack('>I', 6) + b'Exif\x00\x00' + _exif_tiff(taken)
+    ftyp = _box(b'ftyp', b'heic' + struct.pack('>I', 0) + b'mif1heic')
+
+    def meta(exif_offset: int) -> bytes:
+        infe = _box(b'infe', bytes([2, 0, 0, 0]) + struct.pack('>HH', 1, 0) + b'Exif' + b'\x00')
+        iinf = _box(b'iinf', bytes(4) + struct.pack('>H', 1) + infe)
+        iloc = _box(b'iloc', bytes(4) + bytes([0x44, 0x00]) + struct.pack('>HHHHII', 1, 1, 0, 1,
+                                                                               exif_offset, len(exif_item)))
+        hdlr = _box(b'hdlr', bytes(8) + b'pict' + bytes(12) + b'\x00')
+        return _box(b'meta', bytes(4) + hdlr + iinf + iloc)
+
+    # mdat payload starts right after ftyp + meta + the mdat header
+    exif_offset = len(ftyp) + len(meta(0)) + 8
+    return ftyp + meta(exif_offset) + _box(b'mdat', exif_item + payload)
+
+
+def _synthetic_mov(taken: datetime, payload: bytes) -> bytes:
+    seconds = int((taken - datetime(1904, 1, 1)).total_seconds())
+    mvhd = _box(b'mvhd', bytes(4) + struct.pack('>IIII', seconds, seconds, 600, 600) + bytes(80))
+    # moov after mdat, like files written by the camera
+    return _box(b'ftyp', b'qt  ' + struct.pack('>I', 0) + b'qt  ') + _box(b'mdat', payload) + _box(b'moov', mvhd)
+
+
+def create_media_corpus(root: str, count: int, payload_size: int = 8 * 1024 * 1024, seed: int = 0) -> Path:
+    """Write JPEG/HEIC/MOV files with real EXIF/QuickTime headers and filler data"""
+    rng = random.Random(seed)
+    folder = Path(root)
+    folder.mkdir(parents=True, exist_ok=True)
+    payload = bytes(rng.getrandbits(8) for _ in range(4096)) * (payload_size // 4096)
+    writers = [('.JPG', _synthetic_jpeg), ('.HEIC', _synthetic_heic), ('.MOV', _synthetic_mov)]
+
+    start = datetime(2019, 1, 1)
+    for n in range(count):
+        extension, writer = writers[n % len(writers)]
+        taken = start + timedelta(minutes=rng.randrange(60 * 24 * 365 * 5))
+        with open(folder / f"IMG_{n:04d}{extension}", 'wb') as f:
+            f.write(writer(taken, payload))
+    return folder
+
+
+def bench_media_dates(root: str):
+    """Compare the header-only date reader with hachoir on a folder of media files"""
+    files = [path for path in sorted(Path(root).rglob('*')) if path.is_file() and is_photo_file(path.name)]
+    if not files:
+        print(f"No photo/video files under {root}")
+        return
+
+    def run(label, func):
+        t0 = time.perf_counter()
+        dates = [func(path) for path in files]
+        elapsed = time.perf_counter() - t0
+        found = sum(date is not None for date in dates)
+        print(f"{label:<14} {len(files) / max(elapsed, 1e-9):>10,.0f} files/s  "
+              f"{elapsed:8.2f}s  dates found {found}/{len(files)}")
+        return dates
+
+    ours = run("header reader", read_file_date)
+    if not HACHOIR_AVAILABLE:
+        print("hachoir is not installed, skipping the comparison")
+        return
+
+    theirs = run("hachoir", hachoir_date)
+    agree = sum(a is not None and b is not None and a.replace(tzinfo=None) == b.replace(tzinfo=None)
+                for a, b in zip(ours, theirs))
+    both = sum(a is not None and b is not None for a, b in zip(ours, theirs))
+    print(f"agreement: {agree}/{both} files where both found a date")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="iOS Photo Mover benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("make-tree", help="Create a synthetic DCIM tree")
+    p.add_argument("root")
+    p.add_argument("--count", type=int, default=100000)
+    p.add_argument("--files-per-folder", type=int, default=1000)
+    p.add_argument("--file-size", type=int, default=4096)
+
+    p = sub.add_parser("scan", help="Benchmark enumerating a local source")
+    p.add_argument("root")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--index", help="Scan index database (run twice to time a rescan)")
+
+    p = sub.add_parser("catalog", help="Compare memory of the loaded photo list as dicts and as a catalog")
+    p.add_argument("root")
+
+    p = sub.add_parser("dates", help="Micro-benchmark date string parsing")
+    p.add_argument("--count", type=int, default=100000)
+    p.add_argument("--unique", type=int, default=500, help="Distinct strings (repeats hit the cache)")
+
+    p = sub.add_parser("make-media", help="Create JPEG/HEIC/MOV files with date headers")
+    p.add_argument("root")
+    p.add_argument("--count", type=int, default=300)
+    p.add_argument("--payload-size", type=int, default=8 * 1024 * 1024, help="Filler bytes per file")
+
+    p = sub.add_parser("media-dates", help="Compare the header date reader with hachoir")
+    p.add_argument("root", help="Folder of sample photos/videos")
+
+    args = parser.parse_args()
+
+    if args.command == "make-tree":
+        t0 = time.perf_counter()
+        dcim = create_synthetic_dcim(args.root, args.count, args.files_per_folder, args.file_size)
+        print(f"Created {args.count} files under {dcim} in {time.perf_counter() - t0:.2f}s")
+    elif args.command == "scan":
+        bench_scan(args.root, args.workers, args.index)
+    elif args.command == "catalog":
+        bench_catalog(args.root)
+    elif args.command == "dates":
+        bench_dates(args.count, args.unique)
+    elif args.command == "make-media":
+        folder = create_media_corpus(args.root, args.count, args.payload_size)
+        print(f"Created {args.count} media files under {folder}")
+    elif args.command == "media-dates":
+        bench_media_dates(args.root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+import calendar
+import sys
+from array import array
+from datetime import date
+from itertools import compress
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from planner import DestinationIndex, destination_folder, find_in_folder
+
+
+UNKNOWN_DATE = "Unknown"
+
+# Columns sort_order() can sort by
+SORT_COLUMNS = ("name", "folder", "type", "date", "size")
+
+
+def date_ordinal(date_str: str) -> int:
+    """Day number of a YYYY-MM-DD record date (0 for Unknown)"""
+    try:
+        return date.fromisoformat(date_str).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+def date_string(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat() if ordinal else UNKNOWN_DATE
+
+
+def day_bound(text: str, end: bool = False) -> int:
+    """Day number of YYYY, YYYY-MM or YYYY-MM-DD; with end, the last day of a year or month"""
+    parts = [int(part) for part in text.strip().split('-')]
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"expected YYYY, YYYY-MM or YYYY-MM-DD, got {text!r}")
+    year = parts[0]
+    month = parts[1] if len(parts) > 1 else (12 if end else 1)
+    if len(parts) == 3:
+        day = parts[2]
+    else:
+        day = calendar.monthrange(year, month)[1] if end else 1
+    return date(year, month, day).toordinal()
+
+
+def _lookup(table: bytes, ids: array) -> bytes:
+    """table[id] for every id in a column"""
+    if len(table) <= 256:
+        # Every id fits in its lowest byte: pick those bytes and translate them
+        low = 0 if sys.byteorder == 'little' else ids.itemsize - 1
+        return ids.tobytes()[low::ids.itemsize].translate(table.ljust(256, b'\0'))
+    return bytes(map(table.__getitem__, ids))
+
+
+def _and(first: bytes, second: bytes) -> bytes:
+    # Flags are 0/1 bytes, so one big-integer AND combines every row at once
+    return (int.from_bytes(first, 'little') & int.from_bytes(second, 'little')).to_bytes(len(first), 'little')
+
+
+class PhotoCatalog:
+    """Scanned photos stored column by column
+
+    One row per photo: name, folder, size, date and type live in parallel
+    arrays and lists (folder and type as indexes into small tables of
+    interned strings), so a row costs a few dozen bytes instead of a dict,
+    a DeviceItem and the Shell objects it holds. The device path is
+    rebuilt from folder and name when it has that shape and stored as is
+    otherwise. No device handles are kept: record() returns a plain
+    record and the copy resolves the file on the device when it needs it
+    (DeviceSource.resolve).
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.folder = array('I')  # Index into folders
+        self.size = array('q')
+        self.date = array('i')  # Date ordinal, 0 = Unknown
+        self.type = array('H')  # Index into types
+
+        self.folders: List[Tuple[str, str, Optional[str]]] = []  # (path, name, separator)
+        self.types: List[str] = []
+        self._folder_ids: Dict[str, int] = {}
+        self._type_ids: Dict[str, int] = {}
+        self._rows_by_folder: List[Dict[str, int]] = []  # Per folder: name -> row
+        self._explicit_paths: Dict[int, str] = {}  # Rows whose path is not folder + separator + name
+        self._rows_by_path: Dict[str, int] = {}
+        self._in_destination: Optional[Tuple[tuple, bytes]] = None  # (arguments, flags) of the last call
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def clear(self):
+        self.__init__()
+
+    def append(self, record: Dict) -> int:
+        """Add a scanned photo record (with its DeviceItem); returns its row"""
+        item = record['item']
+        row = len(self.names)
+        name = sys.intern(record['filename'])
+        folder_id = self._folder_id(item.folder_path, item.folder_name)
+        folder_path, folder_name, sep = self.folders[folder_id]
+
+        path = record['path']
+        if sep is None:
+            # First photo of the folder decides how paths are joined
+            for candidate in ('\\', '/'):
+                if path == folder_path + candidate + name:
+                    sep = candidate
+                    self.folders[folder_id] = (folder_path, folder_name, sep)
+                    break
+        if sep is not None and path == folder_path + sep + name and name not in self._rows_by_folder[folder_id]:
+            self._rows_by_folder[folder_id][name] = row
+        else:
+            self._explicit_paths[row] = path
+            self._rows_by_path[path] = row
+
+        self.names.append(name)
+        self.folder.append(folder_id)
+        self.size.append(max(0, record.get('size', 0)))
+        self.date.append(date_ordinal(record.get('date')))
+        self.type.append(self._type_id(record.get('type', 'Unknown')))
+        return row
+
+    def path(self, row: int) -> str:
+        explicit = self._explicit_paths.get(row)
+        if explicit is not None:
+            return explicit
+        folder_path, _, sep = self.folders[self.folder[row]]
+        return folder_path + sep + self.names[row]
+
+    def find(self, path: str) -> Optional[int]:
+        """Row of the photo with this device path"""
+        row = self._rows_by_path.get(path)
+        if row is not None:
+            return row
+        cut = max(path.rfind('\\'), path.rfind('/'))
+        folder_id = self._folder_ids.get(path[:cut])
+        if folder_id is None:
+            return None
+        return self._rows_by_folder[folder_id].get(path[cut + 1:])
+
+    def record(self, row: int) -> Dict:
+        """Photo record of a row, as the scanner produces it minus the device item"""
+        folder_path, folder_name, _ = self.folders[self.folder[row]]
+        return {
+            'path': self.path(row),
+            'filename': self.names[row],
+            'folder_path': folder_path,
+            'folder_name': folder_name,
+            'date': date_string(self.date[row]),
+            'size': self.size[row],
+            'type': self.types[self.type[row]],
+        }
+
+    def match(self, since: int = 0, until: int = 0, types: Optional[Iterable[str]] = None,
+              min_size: Optional[int] = None, max_size: Optional[int] = None,
+              folders: Optional[Iterable[str]] = None) -> bytes:
+        """One byte per row, 1 where the photo meets every condition given
+
+        since/until are day numbers (see day_bound), inclusive; photos with
+        an Unknown date only match when neither is given. types are file
+        types (HEIC, MOV, ...) and folders folder names or paths. Each
+        condition is evaluated over a whole column at once (map() of a
+        comparison over the array, bytes.translate through the type and
+        folder tables), so no Python code runs per photo.
+        """
+        flags = bytes([1]) * len(self.names)
+        if types is not None:
+            wanted = {file_type.upper().lstrip('.') for file_type in types}
+            table = bytes(file_type.upper() in wanted for file_type in self.types)
+            flags = _and(flags, _lookup(table, self.type))
+        if folders is not None:
+            wanted = set(folders)
+            table = bytes(path in wanted or name in wanted for path, name, _ in self.folders)
+            flags = _and(flags, _lookup(table, self.folder))
+        if since or until:
+            flags = _and(flags, bytes(map(max(since, 1).__le__, self.date)))
+        if until:
+            flags = _and(flags, bytes(map(until.__ge__, self.date)))
+        if min_size is not None:
+            flags = _and(flags, bytes(map(min_size.__le__, self.size)))
+        if max_size is not None:
+            flags = _and(flags, bytes(map(max_size.__ge__, self.size)))
+        return flags
+
+    def in_destination(self, index: DestinationIndex, sort_mode: str, base_path: str, unknown_path: str,
+                       exact_sizes: bool = True) -> bytes:
+        """One byte per row, 1 where the destination folder already has the photo (same name and size)
+
+        Uses the index as built, without the stat the import planner does
+        to confirm each hit. Rows are grouped by destination folder and
+        (folder, name, size) is looked up in one set for the whole column;
+        only rows whose name is there with another size (keep_both renames,
+        rounded sizes) go on to the rename and size checks. The flags are cached until
+        the index or the catalog changes.
+        """
+        key = (id(index), index.version, sort_mode, base_path, unknown_path, exact_sizes, len(self.names))
+        if self._in_destination is not None and self._in_destination[0] == key:
+            return self._in_destination[1]
+
+        # Destination folder of each distinct date, numbered
+        folders: List[Path] = []
+        folder_ids: Dict[Path, int] = {}
+        day_folders = {}  # Date ordinal -> folder number
+        for day in set(self.date):
+            folder = destination_folder(date_string(day), sort_mode, base_path, unknown_path)
+            day_folders[day] = folder_ids.setdefault(folder, len(folder_ids))
+            if len(folders) < len(folder_ids):
+                folders.append(folder)
+
+        listings = [index.folder_files(folder) for folder in folders]
+        named = {(folder_id, name) for folder_id, files in enumerate(listings) for name in files}
+        present = {(folder_id, name, size) for folder_id, files in enumerate(listings)
+                   for name, (_, size) in files.items() if size > 0}
+
+        row_folders = list(map(day_folders.__getitem__, self.date))
+        names = list(map(str.lower, self.names))
+        flags = bytearray(map(present.__contains__, zip(row_folders, names, self.size)))
+        for row in compress(range(len(flags)), map(named.__contains__, zip(row_folders, names))):
+            if not flags[row] and find_in_folder(listings[row_folders[row]], names[row], self.size[row], exact_sizes):
+                flags[row] = 1
+
+        flags = bytes(flags)
+        self._in_destination = (key, flags)
+        return flags
+
+    def rows(self, flags: bytes) -> List[int]:
+        """Rows whose flag is set"""
+        return list(compress(range(len(flags)), flags))
+
+    def sort_order(self, column: str, reverse: bool = False) -> array:
+        """Rows in the order of a column (one of SORT_COLUMNS); ties keep scan order"""
+        if column == "name":
+            key = self.names.__getitem__
+        elif column == "date":
+            key = self.date.__getitem__
+        elif column == "size":
+            key = self.size.__getitem__
+        elif column in ("type", "folder"):
+            # Rank the small table once, then sort rows by the rank of their entry
+            table = self.types if column == "type" else [name for _, name, _ in self.folders]
+            ranks = [0] * len(table)
+            for rank, entry in enumerate(sorted(range(len(table)), key=table.__getitem__)):
+                ranks[entry] = rank
+            key = list(map(ranks.__getitem__, self.type if column == "type" else self.folder)).__getitem__
+        else:
+            raise ValueError(f"cannot sort by {column!r}")
+        return array('I', sorted(range(len(self.names)), key=key, reverse=reverse))
+
+    def month_counts(self, flags: Optional[bytes] = None) -> List[Tuple[str, int, int]]:
+        """(YYYY-MM, photos, bytes) per month of the flagged rows (all rows without flags)
+
+        Photos with an Unknown date are counted last under "Unknown".
+        """
+        dates = compress(self.date, flags) if flags is not None else self.date
+        sizes = compress(self.size, flags) if flags is not None else self.size
+        days = {}  # Date ordinal -> [photos, bytes]
+        for day, size in zip(dates, sizes):
+            totals = days.get(day)
+            if totals is None:
+                days[day] = [1, size]
+            else:
+                totals[0] += 1
+                totals[1] += size
+
+        months = {}
+        for day, (count, size) in days.items():
+            month = date_string(day)[:7]
+            totals = months.setdefault(month, [0, 0])
+            totals[0] += count
+            totals[1] += size
+        unknown = months.pop(UNKNOWN_DATE, None)
+        result = [(month, count, size) for month, (count, size) in sorted(months.items())]
+        if unknown:
+            result.append((UNKNOWN_DATE, unknown[0], unknown[1]))
+        return result
+
+    def _folder_id(self, folder_path: str, folder_name: str) -> int:
+        folder_id = self._folder_ids.get(folder_path)
+        if folder_id is None:
+            folder_id = len(self.folders)
+            self.folders.append((sys.intern(folder_path), sys.intern(folder_name), None))
+            self._folder_ids[folder_path] = folder_id
+            self._rows_by_folder.append({})
+        return folder_id
+
+    def _type_id(self, file_type: str) -> int:
+        type_id = self._type_ids.get(file_type)
+        if type_id is None:
+            type_id = len(self.types)
+            self.types.append(sys.intern(file_type))
+            self._type_ids[file_type] = type_id
+        return type_id
@@ -0,0 +1,279 @@
+"""Import photos without the GUI, for scripted and unattended runs
+
+Settings come from config.json (as saved by the app) and are overridden
+by the flags given. With --json every line written to stdout is a JSON
+event: {"event": "log" | "scan" | "selected" | "plan" | "file" | "summary", ...}.
+
+Usage:
+    python cli.py [--source DIR] [--output DIR] [--unknown DIR]
+                  [--sort-mode Month_Year|Date_Month_Year]
+                  [--duplicate-mode overwrite|keep_both|skip|skip_identical_content]
+                  [--since YYYY-MM-DD] [--until YYYY-MM-DD] [--type HEIC ...] [--name 'IMG_*']
+                  [--copy-workers 4] [--scan-workers 4] [--dry-run] [--resume] [--json]
+
+Exit status: 0 when every file was imported or skipped, 1 when some
+failed, 2 when the import could not start.
+"""
+import argparse
+import fnmatch
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from engine import ImportEngine, ImportJob, default_settings, format_size, open_source, find_storage, scan_photos, prepare_resume, resume_settings
+from journal import load_last_run, unfinished_files
+from log_sink import LEVELS, INFO, WARNING, ERROR
+
+
+def load_settings(config_path: Path) -> Dict:
+    """Defaults updated with config.json, if it exists"""
+    settings = default_settings()
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            settings.update(json.load(f))
+    return settings
+
+
+def apply_args(settings: Dict, args: argparse.Namespace) -> Dict:
+    """Override settings with the flags that were given"""
+    overrides = {
+        "local_source_path": args.source,
+        "output_base_path": args.output,
+        "unknown_folder_path": args.unknown,
+        "sort_mode": args.sort_mode,
+        "duplicate_mode": args.duplicate_mode,
+        "copy_method": args.copy_method,
+        "copy_workers": args.copy_workers,
+        "scan_workers": args.scan_workers,
+        "hash_workers": args.hash_workers,
+    }
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    if args.no_auto_tune:
+        settings["copy_auto_tune"] = False
+    if args.no_scan_index:
+        settings["use_scan_index"] = False
+    if args.deep_dates:
+        settings["deep_date_scan"] = True
+    if args.copy_present:
+        settings["skip_already_present"] = False
+    return settings
+
+
+def parse_day(value: str) -> str:
+    """argparse type for YYYY-MM-DD dates (kept as strings, like record dates)"""
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+    return value
+
+
+def record_filter(args: argparse.Namespace) -> Callable[[Dict], bool]:
+    """Build the predicate selecting which scanned records to import
+
+    Record dates are YYYY-MM-DD strings, so date ranges compare as text;
+    photos with an Unknown date are left out once a range is given.
+    """
+    types = {t.upper().lstrip('.') for t in args.type} if args.type else None
+    names = [pattern.lower() for pattern in args.name] if args.name else None
+
+    def selected(record: Dict) -> bool:
+        if types and record['type'].upper() not in types:
+            return False
+        if names and not any(fnmatch.fnmatchcase(record['filename'].lower(), pattern) for pattern in names):
+            return False
+        if args.since or args.until:
+            date = record.get('date', "Unknown")
+            if date == "Unknown":
+                return False
+            if args.since and date < args.since:
+                return False
+            if args.until and date > args.until:
+                return False
+        return True
+
+    return selected
+
+
+class Reporter:
+    """Writes progress either as plain log lines or as JSON lines on stdout"""
+
+    def __init__(self, as_json: bool, quiet: bool = False, level: str = "info"):
+        self.as_json = as_json
+        self.quiet = quiet
+        self.level = LEVELS[level]
+        self.level_names = {value: name for name, value in LEVELS.items()}
+        self._lock = threading.Lock()  # Copy workers report concurrently
+
+    def emit(self, event: str, **fields):
+        if not self.as_json:
+            return
+        line = json.dumps(dict(event=event, time=round(time.time(), 3), **fields), default=str, ensure_ascii=False)
+        with self._lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def log(self, message: str, level: int = INFO):
+        if level < self.level:
+            return
+        if self.as_json:
+            self.emit("log", level=self.level_names[level], message=message)
+        elif not self.quiet:
+            with self._lock:
+                print(message, flush=True)
+
+    def file_done(self, event: Dict):
+        self.emit("file", **event)
+
+    def text(self, message: str):
+        """Line shown in text mode only (JSON mode has an event for it)"""
+        if not self.as_json and not self.quiet:
+            with self._lock:
+                print(message, flush=True)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Import photos from an iOS device or a DCIM folder without the GUI")
+    parser.add_argument('--config', default="config.json", help="settings file (default: config.json)")
+
+    paths = parser.add_argument_group("paths")
+    paths.add_argument('--source', help="local DCIM-style directory to import from instead of a device")
+    paths.add_argument('--output', help="output base path")
+    paths.add_argument('--unknown', help="folder for photos without a date")
+
+    modes = parser.add_argument_group("modes")
+    modes.add_argument('--sort-mode', choices=["Month_Year", "Date_Month_Year"])
+    modes.add_argument('--duplicate-mode', choices=["overwrite", "keep_both", "skip", "skip_identical_content"])
+    modes.add_argument('--copy-method', choices=["stream", "shell"])
+
+    concurrency = parser.add_argument_group("concurrency")
+    concurrency.add_argument('--copy-workers', type=int, help="maximum transfers in flight")
+    concurrency.add_argument('--no-auto-tune', action='store_true', help="keep --copy-workers transfers in flight")
+    concurrency.add_argument('--scan-workers', type=int, help="folders listed concurrently while scanning")
+    concurrency.add_argument('--hash-workers', type=int, help="files hashed concurrently (skip_identical_content)")
+
+    scanning = parser.add_argument_group("scanning")
+    scanning.add_argument('--deep-dates', action='store_true', help="read capture dates from file headers")
+    scanning.add_argument('--no-scan-index', action='store_true', help="do not reuse scan_index.db")
+
+    filters = parser.add_argument_group("filters")
+    filters.add_argument('--since', type=parse_day, help="only photos dated on or after this day")
+    filters.add_argument('--until', type=parse_day, help="only photos dated on or before this day")
+    filters.add_argument('--type', action='append', help="only this file type, e.g. HEIC (repeatable)")
+    filters.add_argument('--name', action='append', help="only file names matching this glob (repeatable)")
+    filters.add_argument('--copy-present', action='store_true',
+                         help="copy photos even if their name and size are already in the destination")
+
+    run = parser.add_argument_group("run")
+    run.add_argument('--dry-run', action='store_true', help="scan and plan, but copy nothing")
+    run.add_argument('--resume', action='store_true', help="finish the last interrupted import")
+    run.add_argument('--json', action='store_true', help="write JSON lines events to stdout")
+    run.add_argument('--quiet', action='store_true', help="only print the summary (text mode)")
+    run.add_argument('--log-level', choices=list(LEVELS), default="info",
+                     help="least important log lines shown (default: info; debug adds per-file detail)")
+    return parser
+
+
+def run(args: argparse.Namespace) -> int:
+    reporter = Reporter(args.json, args.quiet, args.log_level)
+
+    try:
+        settings = apply_args(load_settings(Path(args.config)), args)
+    except (OSError, ValueError) as e:
+        reporter.log(f"Error loading config: {e}", level=ERROR)
+        return 2
+
+    resume_run = None
+    pending = {}
+    stamped = []
+    if args.resume:
+        last = load_last_run(Path("transfer_journal.jsonl"))
+        pending = unfinished_files(last) if last else {}
+        if not pending:
+            reporter.log("There is no unfinished import to resume.")
+            return 0
+        # Continue with the settings the import was started with
+        resume_run = last['run']
+        settings.update(resume_settings(last['settings']))
+
+    if not settings.get("output_base_path") or not settings.get("unknown_folder_path"):
+        reporter.log("Output and unknown folder paths must be set", level=ERROR)
+        return 2
+
+    try:
+        source = open_source(settings, reporter.log)
+    except Exception as e:
+        reporter.log(f"Failed to connect: {e}", level=ERROR)
+        return 2
+    if not source:
+        reporter.log("No iOS device found", level=ERROR)
+        return 2
+
+    # The scan and the import run on this thread, which needs COM like a worker
+    source.thread_init()
+    try:
+        storage = find_storage(source.list_storages(), reporter.log)
+        if not storage:
+            reporter.log("Cannot find Internal Storage on device", level=ERROR)
+            return 2
+
+        reporter.log(f"Scanning {source.name} / {storage.name}...")
+        start = time.perf_counter()
+        records = list(scan_photos(source, storage, settings, reporter.log))
+        reporter.emit("scan", photos=len(records), elapsed=time.perf_counter() - start)
+        reporter.text(f"Found {len(records)} photo(s) in {time.perf_counter() - start:.1f}s")
+
+        if resume_run:
+            records, missing, stamped = prepare_resume(pending, {record['path']: record for record in records},
+                                                       reporter.log)
+            if missing:
+                reporter.log(f"{missing} file(s) are no longer on the device and will be left out", level=WARNING)
+        else:
+            selected = record_filter(args)
+            records = [record for record in records if selected(record)]
+        total_bytes = sum(record['size'] for record in records)
+        reporter.emit("selected", photos=len(records), bytes=total_bytes)
+        reporter.text(f"Selected {len(records)} photo(s), {format_size(total_bytes)}")
+
+        engine = ImportEngine(log=reporter.log, on_file=reporter.file_done)
+        job = ImportJob.create(source, records, settings, resume_run, stamped)
+        if args.dry_run:
+            entries, present = engine.plan(job)
+            for photo_info, dest_folder in entries:
+                reporter.emit("plan", path=photo_info['path'], filename=photo_info['filename'],
+                              size=photo_info['size'], action="copy", dest=str(dest_folder))
+                reporter.text(f"copy  {photo_info['path']} -> {dest_folder}")
+            for photo_info, existing in present:
+                reporter.emit("plan", path=photo_info['path'], filename=photo_info['filename'],
+                              size=photo_info['size'], action="present", dest=str(existing))
+                reporter.text(f"skip  {photo_info['path']} (already at {existing})")
+            reporter.emit("summary", dry_run=True, to_copy=len(entries), present=len(present))
+            reporter.text(f"Would copy {len(entries)} file(s), {len(present)} already present")
+            return 0
+
+        summary = engine.run(job)
+    except KeyboardInterrupt:
+        reporter.log("Interrupted; run with --resume to finish this import", level=WARNING)
+        return 1
+    except Exception as e:
+        reporter.log(f"Fatal error: {e}", level=ERROR)
+        return 2
+    finally:
+        source.thread_uninit()
+
+    reporter.emit("summary", **summary)
+    if args.quiet and not args.json:
+        print(f"Moved: {summary['moved']}  Skipped: {summary['skipped']}  Errors: {summary['failed']}")
+    return 1 if summary['failed'] else 0
+
+
+def main(argv: List[str] = None) -> int:
+    return run(build_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from log_sink import DEBUG
+from transfer import SHELL_STAGING_FOLDER, PARTIAL_SUFFIX
+
+
+# Bytes read from each end of a file for the fast hash
+FAST_HASH_BYTES = 64 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def fast_hash(f, size: int) -> str:
+    """Hash of a file's size plus its first and last FAST_HASH_BYTES
+
+    Cheap enough to run over a whole library; two files with a different
+    fast hash are certainly different, equal ones need a full hash.
+    """
+    digest = hashlib.blake2b(str(size).encode('ascii'), digest_size=16)
+    digest.update(f.read(FAST_HASH_BYTES))
+    if size > 2 * FAST_HASH_BYTES:
+        f.seek(size - FAST_HASH_BYTES)
+    digest.update(f.read(FAST_HASH_BYTES))
+    return digest.hexdigest()
+
+
+def full_hash(f, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Hash of a file's entire content, read in chunks"""
+    digest = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while True:
+        n = f.readinto(buffer)
+        if not n:
+            break
+        digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def _walk_files(root: Path) -> Iterator[Tuple[str, int, int]]:
+    """Yield (path, size, mtime_ns) of every file under root (copies in progress excluded)"""
+    stack = [str(root)]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name != SHELL_STAGING_FOLDER:
+                                stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False) and not entry.name.endswith(PARTIAL_SUFFIX):
+                            st = entry.stat()
+                            yield entry.path, st.st_size, st.st_mtime_ns
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+class ContentIndex:
+    """Persistent content-hash index of every file in the output library
+
+    Each file is stored with its size, mtime and fast hash; the full hash
+    is only computed when another file with the same size and fast hash
+    shows up. A rebuild re-hashes just the files whose size or mtime
+    changed, so keeping a large library indexed stays cheap.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            root TEXT NOT NULL,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            fast_hash TEXT NOT NULL,
+            full_hash TEXT,
+            PRIMARY KEY (root, path)
+        );
+        CREATE INDEX IF NOT EXISTS files_by_hash ON files (root, size, fast_hash);
+    """
+
+    def __init__(self, root: str, db_path: str = "content_index.db"):
+        self.root = str(Path(root))
+        self.db_path = Path(db_path)
+        # Hashing workers share one connection, serialized by the lock
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(self.SCHEMA)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def build(self, workers: int = 8, log: Callable[..., None] = None, batch_size: int = 500) -> Dict:
+        """Bring the index up to date with the files under root
+
+        The tree is walked once; new or changed files are hashed by a pool
+        of workers with a bounded number of files in flight, and results
+        are written in batches. Entries of files that are gone are dropped.
+        """
+        with self._lock:
+            known = {path: (size, mtime_ns) for path, size, mtime_ns in self._conn.execute(
+                "SELECT path, size, mtime_ns FROM files WHERE root = ?", (self.root,))}
+
+        stats = {'files': 0, 'hashed': 0, 'removed': 0, 'errors': 0}
+        seen = set()
+        rows = []
+
+        def hash_one(path: str, size: int, mtime_ns: int):
+            with open(path, 'rb') as f:
+                return path, size, mtime_ns, fast_hash(f, size)
+
+        def collect(futures):
+            for future in futures:
+                try:
+                    rows.append(future.result())
+                    stats['hashed'] += 1
+                except OSError:
+                    stats['errors'] += 1
+            if len(rows) >= batch_size:
+                self._save(rows)
+                rows.clear()
+                if log:
+                    log(f"  Indexed {stats['hashed']} file(s)...", level=DEBUG)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            in_flight = set()
+            for path, size, mtime_ns in _walk_files(Path(self.root)):
+                stats['files'] += 1
+                seen.add(path)
+                if known.get(path) == (size, mtime_ns):
+                    continue
+                in_flight.add(pool.submit(hash_one, path, size, mtime_ns))
+                if len(in_flight) >= workers * 4:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(in_flight)
+
+        if rows:
+            self._save(rows)
+
+        gone = [(self.root, path) for path in known if path not in seen]
+        if gone:
+            with self._lock:
+                with self._conn:
+                    self._conn.executemany("DELETE FROM files WHERE root = ? AND path = ?", gone)
+            stats['removed'] = len(gone)
+
+        return stats
+
+    def add(self, path: Path) -> str:
+        """Index a file that just landed in the library; returns its fast hash"""
+        st = os.stat(path)
+        with open(path, 'rb') as f:
+            digest = fast_hash(f, st.st_size)
+        self._save([(str(path), st.st_size, st.st_mtime_ns, digest)])
+        return digest
+
+    def remove(self, path: Path):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM files WHERE root = ? AND path = ?", (self.root, str(path)))
+
+    def find_identical(self, path: Path) -> Optional[str]:
+        """Return another indexed file with exactly the same content as path, if any"""
+        path = Path(path)
+        size = os.stat(path).st_size
+        with open(path, 'rb') as f:
+            digest = fast_hash(f, size)
+
+        with self._lock:
+            candidates = self._conn.execute(
+                "SELECT path, mtime_ns, full_hash FROM files WHERE root = ? AND size = ? AND fast_hash = ? AND path != ?",
+                (self.root, size, digest, str(path))).fetchall()
+        if not candidates:
+            return None
+
+        # Fast hashes collide: settle it with full hashes (cached per file)
+        with open(path, 'rb') as f:
+            own_full = full_hash(f)
+
+        for candidate, mtime_ns, candidate_full in candidates:
+            try:
+                st = os.stat(candidate)
+                if st.st_size != size or st.st_mtime_ns != mtime_ns:
+                    # Changed since it was indexed; drop the entry, the next build re-hashes it
+                    self.remove(Path(candidate))
+                    continue
+                if candidate_full is None:
+                    with open(candidate, 'rb') as f:
+                        candidate_full = full_hash(f)
+                    with self._lock:
+                        with self._conn:
+                            self._conn.execute("UPDATE files SET full_hash = ? WHERE root = ? AND path = ?",
+                                               (candidate_full, self.root, candidate))
+            except OSError:
+                self.remove(Path(candidate))
+                continue
+            if candidate_full == own_full:
+                return candidate
+
+        return None
+
+    def _save(self, rows):
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO files (root, path, size, mtime_ns, fast_hash, full_hash) "
+                    "VALUES (?, ?, ?, ?, ?, NULL)",
+                    [(self.root, path, size, mtime_ns, digest) for path, size, mtime_ns, digest in rows])
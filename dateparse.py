@@ -0,0 +1,115 @@
+import locale
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+
+# Windows wraps date columns in invisible direction marks (U+200E etc.)
+_DIRECTION_MARKS = dict.fromkeys(map(ord, '\u200e\u200f\u202a\u202b\u202c\u202d\u202e'), None)
+
+_TIME = r'(?:[ T]+(\d{1,2}):(\d{2})(?::(\d{2}))?(?:\.\d+)?\s*([AaPp]\.?[Mm]\.?)?)?'
+
+# 2024-01-15, 2024/01/15 13:45:00, 2024:01:15 13:45:00 (EXIF)
+_YEAR_FIRST = re.compile(r'^(\d{4})[-/.:](\d{1,2})[-/.:](\d{1,2})' + _TIME + r'\s*$')
+
+# 1/15/2024 1:45 PM, 15/01/2024 13:45, 15.01.24
+_NUMERIC = re.compile(r'^(\d{1,2})[-/.](\d{1,2})[-/.](\d{2}|\d{4})' + _TIME + r'\s*$')
+
+# 30-Dec-25 7:27 PM, 30 Dec 2025
+_MONTH_NAME = re.compile(r'^(\d{1,2})[- ]([A-Za-z]{3})[A-Za-z]*\.?[- ](\d{2}|\d{4})' + _TIME + r'\s*$')
+
+# 20240115
+_COMPACT = re.compile(r'^(\d{4})(\d{2})(\d{2})$')
+
+_MONTHS = {name: i for i, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1)}
+
+
+def detect_day_first() -> bool:
+    """Check whether the user's locale writes dates day-first (15/01/2024)
+
+    Switches LC_TIME, which is process-wide and not thread-safe, so only
+    call this from the main thread while no other thread is running.
+    """
+    try:
+        previous = locale.setlocale(locale.LC_TIME)
+        try:
+            locale.setlocale(locale.LC_TIME, '')
+            # 3 February 2001 -> '2/3/2001' (month first) or '03/02/2001' (day first)
+            sample = time.strftime('%x', (2001, 2, 3, 0, 0, 0, 5, 34, 0))
+        finally:
+            locale.setlocale(locale.LC_TIME, previous)
+    except Exception:
+        return False
+    digits = [int(part) for part in re.findall(r'\d+', sample)]
+    return digits[:2] == [3, 2]
+
+
+# Detected once at import (on the main thread, before any scan starts) so
+# parse_date never touches the locale from scanner worker threads
+DAY_FIRST = detect_day_first()
+
+
+def _build(year: int, month: int, day: int, hour, minute, second, ampm) -> Optional[datetime]:
+    if year < 100:
+        year += 2000
+    hour = int(hour) if hour else 0
+    if ampm:
+        pm = ampm[0] in 'Pp'
+        if hour == 12:
+            hour = 12 if pm else 0
+        elif pm:
+            hour += 12
+    try:
+        return datetime(year, month, day, hour, int(minute or 0), int(second or 0))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def parse_date(text: str) -> Optional[datetime]:
+    """Parse a date/time string from Shell columns, EXIF or file names
+
+    Handles year-first, numeric (month/day order from the locale, or
+    whichever order is valid when one part is over 12), month-name and
+    compact YYYYMMDD forms. Results are cached because date columns
+    repeat heavily within a folder.
+    """
+    if not text:
+        return None
+    text = text.translate(_DIRECTION_MARKS).strip()
+
+    match = _YEAR_FIRST.match(text)
+    if match:
+        year, month, day, hour, minute, second, ampm = match.groups()
+        return _build(int(year), int(month), int(day), hour, minute, second, ampm)
+
+    match = _NUMERIC.match(text)
+    if match:
+        first, second_part, year, hour, minute, second, ampm = match.groups()
+        first, second_part = int(first), int(second_part)
+        if first > 12:
+            day_first = True
+        elif second_part > 12:
+            day_first = False
+        else:
+            day_first = DAY_FIRST
+        day, month = (first, second_part) if day_first else (second_part, first)
+        return _build(int(year), month, day, hour, minute, second, ampm)
+
+    match = _MONTH_NAME.match(text)
+    if match:
+        day, month_name, year, hour, minute, second, ampm = match.groups()
+        month = _MONTHS.get(month_name.lower())
+        if month is None:
+            return None
+        return _build(int(year), month, int(day), hour, minute, second, ampm)
+
+    match = _COMPACT.match(text)
+    if match:
+        year, month, day = match.groups()
+        return _build(int(year), int(month), int(day), None, None, None, None)
+
+    return None
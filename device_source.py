@@ -0,0 +1,417 @@
+import io
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from dateparse import parse_date
+
+try:
+    import win32com.client
+    import pythoncom
+    from win32com.shell import shell as shell_api
+    WINDOWS_SUPPORT = True
+except ImportError:
+    WINDOWS_SUPPORT = False
+
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.heic', '.mov', '.mp4')
+
+# Metadata fields that can hold a capture date, most authoritative first
+DATE_FIELDS = ("Date taken", "Media created", "Date modified", "Date created")
+
+
+def is_photo_file(filename: str) -> bool:
+    """Check if filename has a supported photo/video extension"""
+    return filename.lower().endswith(PHOTO_EXTENSIONS)
+
+
+def parse_size_string(size_detail: str) -> int:
+    """Parse a Shell size string (e.g. '2.4 MB', '1,024 bytes') to bytes"""
+    size_detail = size_detail.strip()
+    if 'KB' in size_detail:
+        return int(float(size_detail.replace('KB', '').replace(',', '').strip()) * 1024)
+    elif 'MB' in size_detail:
+        return int(float(size_detail.replace('MB', '').replace(',', '').strip()) * 1024 * 1024)
+    elif 'GB' in size_detail:
+        return int(float(size_detail.replace('GB', '').replace(',', '').strip()) * 1024 * 1024 * 1024)
+    elif 'byte' in size_detail.lower():
+        return int(size_detail.split()[0].replace(',', ''))
+    return 0
+
+
+class DeviceItem:
+    """A file or folder on a device source"""
+
+    __slots__ = ('name', 'path', 'is_folder', 'folder_name', 'folder_path', 'handle', 'parent_handle')
+
+    def __init__(self, name: str, path: str, is_folder: bool, folder_name: str = "",
+                 handle=None, parent_handle=None, folder_path: str = ""):
+        self.name = name
+        self.path = path                    # Unique path on the device (used for dedup)
+        self.is_folder = is_folder
+        self.folder_name = folder_name      # Name of the containing folder (e.g. 202410__)
+        self.folder_path = folder_path      # Path of the containing folder
+        self.handle = handle                # Backend object (Shell FolderItem or local Path)
+        self.parent_handle = parent_handle  # Backend object of the containing folder
+
+    def __repr__(self):
+        return f"DeviceItem({self.path!r}, is_folder={self.is_folder})"
+
+
+class DeviceSource:
+    """Base class for places photos can be enumerated and read from
+
+    Backends implement enumerate (list_storages/list_folder), stat,
+    open_stream, get_metadata and copy_to. Everything the scan and copy
+    pipeline does with a device goes through these operations.
+    """
+
+    # Access strategies understood by list_folder; backends with a single
+    # way of listing folders ignore the strategy argument
+    STRATEGIES = ("default",)
+
+    # Whether stat() sizes are byte counts; rounded sizes are compared with
+    # a tolerance when looking for photos already in the destination
+    EXACT_SIZES = True
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def thread_init(self):
+        """Prepare the calling worker thread to use this source"""
+        pass
+
+    def thread_uninit(self):
+        """Release per-thread resources acquired by thread_init"""
+        pass
+
+    def list_storages(self) -> List[DeviceItem]:
+        """List top-level storages of the device (e.g. Internal Storage)"""
+        raise NotImplementedError
+
+    def list_folder(self, folder: DeviceItem, strategy: Optional[str] = None) -> List[DeviceItem]:
+        """List direct children of a folder"""
+        raise NotImplementedError
+
+    def resolve(self, path: str, name: str, folder_path: str, folder_name: str = "") -> DeviceItem:
+        """Look up a file again from a scanned record (raises IOError if it is gone)
+
+        Lets the photo catalog drop device handles after the scan; the
+        handle is fetched on the thread that uses it.
+        """
+        raise NotImplementedError
+
+    def stat(self, item: DeviceItem) -> Dict:
+        """Return {'size': bytes, 'date': datetime or None} for a file"""
+        raise NotImplementedError
+
+    def get_metadata(self, item: DeviceItem, fields: Optional[tuple] = None) -> Dict[str, str]:
+        """Return non-empty metadata fields of a file as strings
+
+        With fields, only those fields are looked up (in that order).
+        """
+        raise NotImplementedError
+
+    def open_stream(self, item: DeviceItem, buffer_size: int = 1024 * 1024):
+        """Open a file for binary reading (seekable where the device allows it)"""
+        raise NotImplementedError
+
+    def copy_to(self, item: DeviceItem, dest_folder: Path):
+        """Copy a file into dest_folder, keeping its original name"""
+        raise NotImplementedError
+
+
+class ShellColumnCache:
+    """Resolves Shell details column indices by header name, once per folder
+
+    Column layouts differ between MTP folders and NTFS folders, and
+    probing columns blindly costs a COM round trip each. Headers are read
+    once per folder (GetDetailsOf(None, col)) and cached by folder path so
+    every file afterwards only needs targeted lookups.
+    """
+
+    MAX_COLUMNS = 320
+
+    # Column indices used when a folder reports no usable header names
+    FALLBACK = {"Size": 1, "Date modified": 3, "Date created": 4, "Date taken": 12, "Media created": 208}
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def columns(self, shell_folder, key: str) -> Dict[str, int]:
+        """Get the header name -> column index map of a Shell folder"""
+        with self._lock:
+            columns = self._cache.get(key)
+        if columns is not None:
+            return columns
+
+        columns = {}
+        for col in range(self.MAX_COLUMNS):
+            try:
+                header = shell_folder.GetDetailsOf(None, col)
+            except:
+                continue
+            if header and header.strip() and header.strip() not in columns:
+                columns[header.strip()] = col
+
+        if "Size" not in columns and not any(name in columns for name in DATE_FIELDS):
+            columns = dict(self.FALLBACK)
+
+        with self._lock:
+            self._cache[key] = columns
+        return columns
+
+    def get_details(self, shell_folder, key: str, file_obj, fields: tuple) -> Dict[str, str]:
+        """Look up the named fields of one file, skipping empty values"""
+        columns = self.columns(shell_folder, key)
+        details = {}
+        for name in fields:
+            col = columns.get(name)
+            if col is None:
+                continue
+            try:
+                detail = shell_folder.GetDetailsOf(file_obj, col)
+            except:
+                continue
+            if detail and detail.strip():
+                details[name] = detail.strip()
+        return details
+
+
+class _IStreamReader(io.RawIOBase):
+    """Read-only file object over a COM IStream"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.Read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        return n
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # STREAM_SEEK_SET/CUR/END have the same values as io.SEEK_*
+        return int(self._stream.Seek(offset, whence))
+
+    def tell(self):
+        return self.seek(0, io.SEEK_CUR)
+
+    def close(self):
+        self._stream = None
+        super().close()
+
+
+class ShellDeviceSource(DeviceSource):
+    """Device source backed by the Windows Shell (MTP via Explorer)"""
+
+    # Strategies for getting at a folder's children:
+    #   get_folder - FolderItem.GetFolder.Items() (works for MTP devices)
+    #   items      - FolderItem.Items() on the item itself
+    #   namespace  - Shell.NameSpace(item.Path).Items()
+    STRATEGIES = ("get_folder", "items", "namespace")
+
+    # Sizes come from the rounded Size column ("2.34 MB")
+    EXACT_SIZES = False
+
+    def __init__(self, name: str, device_path: str):
+        super().__init__(name)
+        self.device_path = device_path
+        self.columns = ShellColumnCache()
+        self._local = threading.local()  # Per-thread folder lookups for resolve (COM objects are per apartment)
+
+    @classmethod
+    def find_device(cls) -> Optional['ShellDeviceSource']:
+        """Find a connected iOS device in This PC"""
+        shell = win32com.client.Dispatch("Shell.Application")
+
+        # Look for iPhone in "This PC"
+        this_pc = shell.NameSpace(17)  # 17 = ssfDRIVES (This PC)
+
+        # Search for iPhone/iPad
+        for item in this_pc.Items():
+            item_name = item.Name.lower()
+            if 'iphone' in item_name or 'ipad' in item_name or 'apple' in item_name:
+                return cls(item.Name, item.Path)
+
+        return None
+
+    def thread_init(self):
+        pythoncom.CoInitialize()
+
+    def thread_uninit(self):
+        pythoncom.CoUninitialize()
+
+    def _shell(self):
+        return win32com.client.Dispatch("Shell.Application")
+
+    def list_storages(self) -> List[DeviceItem]:
+        device_folder = self._shell().NameSpace(self.device_path)
+        if not device_folder:
+            raise IOError("Cannot access device. Please reconnect.")
+
+        return [DeviceItem(item.Name, item.Path, bool(item.IsFolder), self.name, item, device_folder,
+                           self.device_path)
+                for item in device_folder.Items()]
+
+    def _open_folder(self, folder: DeviceItem, strategy: str):
+        """Get the Shell Folder object and its items for a folder item"""
+        folder_item = folder.handle
+
+        if strategy == "get_folder":
+            shell_folder = folder_item.GetFolder
+            if not shell_folder:
+                raise IOError("GetFolder returned None")
+            return shell_folder, list(shell_folder.Items())
+
+        if strategy == "items":
+            items = folder_item.Items()
+            return folder_item, [items.Item(i) for i in range(items.Count)]
+
+        if strategy == "namespace":
+            shell_folder = self._shell().NameSpace(folder.path)
+            if not shell_folder:
+                raise IOError("Path-based namespace returned None")
+            return shell_folder, list(shell_folder.Items())
+
+        raise ValueError(f"Unknown access strategy: {strategy}")
+
+    def list_folder(self, folder: DeviceItem, strategy: Optional[str] = None) -> List[DeviceItem]:
+        shell_folder, items = self._open_folder(folder, strategy or "get_folder")
+        return [DeviceItem(item.Name, item.Path, bool(item.IsFolder), folder.name, item, shell_folder,
+                           folder.path)
+                for item in items]
+
+    def resolve(self, path: str, name: str, folder_path: str, folder_name: str = "") -> DeviceItem:
+        folders = getattr(self._local, 'folders', None)
+        if folders is None:
+            folders = self._local.folders = {}
+
+        if folder_path not in folders:
+            shell_folder = self._shell().NameSpace(folder_path)
+            if not shell_folder:
+                raise IOError(f"Cannot access folder {folder_name or folder_path}")
+            folders[folder_path] = (shell_folder, None)
+        shell_folder, items_by_path = folders[folder_path]
+
+        file_obj = shell_folder.ParseName(name)
+        if file_obj is None or file_obj.Path != path:
+            # Some MTP folders don't parse names; list the folder once per thread instead
+            if items_by_path is None:
+                items_by_path = {item.Path: item for item in shell_folder.Items()}
+                folders[folder_path] = (shell_folder, items_by_path)
+            file_obj = items_by_path.get(path)
+        if file_obj is None:
+            raise IOError(f"{name} is no longer on the device")
+        return DeviceItem(name, path, False, folder_name, file_obj, shell_folder, folder_path)
+
+    def stat(self, item: DeviceItem) -> Dict:
+        # Usually two lookups: Size, then the first date column that has a value
+        file_size = 0
+        size_detail = self.get_metadata(item, ("Size",)).get("Size")
+        if size_detail:
+            try:
+                file_size = parse_size_string(size_detail)
+            except ValueError:
+                pass
+
+        file_date = None
+        for name in DATE_FIELDS:
+            date_detail = self.get_metadata(item, (name,)).get(name)
+            if date_detail:
+                file_date = parse_date(date_detail)
+                if file_date:
+                    break
+
+        return {'size': file_size, 'date': file_date}
+
+    def get_metadata(self, item: DeviceItem, fields: Optional[tuple] = None) -> Dict[str, str]:
+        if fields is None:
+            # Every named column of the folder among the first 50
+            columns = self.columns.columns(item.parent_handle, item.folder_path)
+            fields = tuple(name for name, col in sorted(columns.items(), key=lambda c: c[1]) if col < 50)
+        return self.columns.get_details(item.parent_handle, item.folder_path, item.handle, fields)
+
+    def open_stream(self, item: DeviceItem, buffer_size: int = 1024 * 1024):
+        shell_item = shell_api.SHCreateItemFromParsingName(item.path, None, shell_api.IID_IShellItem)
+        stream = shell_item.BindToHandler(None, shell_api.BHID_Stream, pythoncom.IID_IStream)
+        return io.BufferedReader(_IStreamReader(stream), buffer_size=buffer_size)
+
+    def copy_to(self, item: DeviceItem, dest_folder: Path):
+        dest_folder_obj = self._shell().NameSpace(str(dest_folder))
+        if not dest_folder_obj:
+            raise IOError(f"Cannot access destination: {dest_folder}")
+
+        # Direct copy with flags (popup will appear, but that's unavoidable with MTP)
+        # FOF_NOCONFIRMATION (0x0010) = Yes to all
+        dest_folder_obj.CopyHere(item.handle, 16)
+
+
+class LocalDeviceSource(DeviceSource):
+    """Device source backed by a local directory laid out like a device
+
+    The directory mirrors what the Shell shows for an iPhone, e.g.
+    ``root/Internal Storage/DCIM/100APPLE/IMG_0001.HEIC`` or
+    ``root/Internal Storage/DCIM/202410__/IMG_0002.MOV``. Used for
+    benchmarking and load-testing the pipeline without a device.
+    """
+
+    def __init__(self, root: str, name: Optional[str] = None):
+        self.root = Path(root)
+        super().__init__(name or self.root.name or str(self.root))
+
+    def _item(self, path: Path, is_folder: bool) -> DeviceItem:
+        return DeviceItem(path.name, str(path), is_folder, path.parent.name, path, path.parent,
+                          str(path.parent))
+
+    def list_storages(self) -> List[DeviceItem]:
+        if not self.root.is_dir():
+            raise IOError(f"Cannot access device directory: {self.root}")
+
+        # A root that directly holds DCIM is itself the storage
+        if (self.root / "DCIM").is_dir():
+            return [self._item(self.root, True)]
+
+        return [self._item(Path(entry.path), entry.is_dir())
+                for entry in sorted(os.scandir(self.root), key=lambda e: e.name)]
+
+    def list_folder(self, folder: DeviceItem, strategy: Optional[str] = None) -> List[DeviceItem]:
+        with os.scandir(folder.handle) as entries:
+            return [self._item(Path(entry.path), entry.is_dir())
+                    for entry in sorted(entries, key=lambda e: e.name)]
+
+    def resolve(self, path: str, name: str, folder_path: str, folder_name: str = "") -> DeviceItem:
+        if not os.path.isfile(path):
+            raise IOError(f"{name} is no longer on the device")
+        return self._item(Path(path), False)
+
+    def stat(self, item: DeviceItem) -> Dict:
+        st = item.handle.stat()
+        return {'size': st.st_size, 'date': datetime.fromtimestamp(st.st_mtime)}
+
+    def get_metadata(self, item: DeviceItem, fields: Optional[tuple] = None) -> Dict[str, str]:
+        st = item.handle.stat()
+        metadata = {
+            'Name': item.name,
+            'Size': f"{st.st_size} bytes",
+            'Date modified': datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        if fields is None:
+            return metadata
+        return {name: metadata[name] for name in fields if name in metadata}
+
+    def open_stream(self, item: DeviceItem, buffer_size: int = 1024 * 1024):
+        return open(item.handle, 'rb', buffering=buffer_size)
+
+    def copy_to(self, item: DeviceItem, dest_folder: Path):
+        shutil.copy2(item.handle, Path(dest_folder) / item.name)
@@ -0,0 +1,753 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+try:
+    from hachoir.parser import createParser
+    from hachoir.metadata import extractMetadata
+    HACHOIR_AVAILABLE = True
+except ImportError:
+    HACHOIR_AVAILABLE = False
+
+# Windows Portable Device support
+try:
+    import win32com.client
+    WINDOWS_SUPPORT = True
+except ImportError:
+    WINDOWS_SUPPORT = False
+
+from content_index import ContentIndex
+from dateparse import parse_date
+from device_source import DeviceItem, DeviceSource, ShellDeviceSource, LocalDeviceSource, ShellColumnCache, DATE_FIELDS
+from journal import TransferJournal, STARTED, COPIED, VERIFIED
+from log_sink import DEBUG, INFO, WARNING, ERROR, print_log
+from media_dates import read_file_date, read_stream_date
+from planner import DestinationIndex, plan_transfer, destination_folder, create_folders, clear_staging
+from scan_index import ScanIndex
+from scanner import PhotoScanner
+from timestamps import TimestampBatch, set_file_times, set_open_file_times
+from transfer import CopyJob, CopyScheduler, TransferProgress, QUEUED, MOVED, SKIPPED, FAILED, SHELL_STAGING_FOLDER, wait_for_copy, copy_stream, partial_path
+
+
+def default_settings() -> Dict:
+    """Settings used when config.json or the command line don't say otherwise"""
+    return {
+        "sort_mode": "Month_Year",
+        "unknown_folder_path": str(Path.home() / "Pictures" / "iOS_Photos" / "Unknown"),
+        "output_base_path": str(Path.home() / "Pictures" / "iOS_Photos"),
+        "duplicate_mode": "overwrite",  # "overwrite", "keep_both", "skip", or "skip_identical_content"
+        "local_source_path": "",  # Use a local DCIM-style directory instead of a device
+        "scan_workers": 4,  # Folders listed concurrently while scanning
+        "use_scan_index": True,  # Reuse size/date of unchanged folders from scan_index.db
+        "deep_date_scan": False,  # Read capture dates from file headers while scanning
+        "deep_date_budget": 262144,  # Bytes read per file at most for a deep date
+        "deep_date_workers": 4,  # Files read concurrently for deep dates
+        "copy_workers": 4,  # Maximum transfers in flight
+        "copy_auto_tune": True,  # Tune transfers in flight from observed throughput
+        "copy_method": "stream",  # "stream" (read bytes directly) or "shell" (CopyHere)
+        "hash_workers": 8,  # Files hashed concurrently when indexing the output library
+        "skip_already_present": True,  # Leave out photos whose name and size are already in the destination
+        "log_level": "info",  # "error", "warning", "info" or "debug" (per-file detail) in the log window
+        "log_lines": 5000,  # Lines kept in the log window
+        "log_file": "ios_photo_mover.log",  # Full log at every level ("" to disable)
+        "log_file_max_bytes": 5242880,  # Log file size before it is rotated
+        "log_file_backups": 3  # Rotated log files kept
+    }
+
+
+def format_size(size_bytes: int) -> str:
+    """Format file size"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size_bytes < 1024.0:
+            return f"{size_bytes:.1f} {unit}"
+        size_bytes /= 1024.0
+    return f"{size_bytes:.1f} TB"
+
+
+def open_source(settings: Dict, log: Callable[..., None] = print_log) -> Optional[DeviceSource]:
+    """Connect to the configured local directory or the first iOS device found"""
+    local_path = settings.get("local_source_path", "")
+    if local_path:
+        # Local DCIM-style directory standing in for a device
+        log(f"Using local source directory: {local_path}")
+        return LocalDeviceSource(local_path)
+    if WINDOWS_SUPPORT:
+        log("Searching for iOS devices...")
+        # Find iOS device in Windows Portable Devices
+        return ShellDeviceSource.find_device()
+    log("Windows Shell support not available (pywin32 missing)", level=WARNING)
+    return None
+
+
+def find_storage(storages: List[DeviceItem], log: Callable[..., None] = print_log) -> Optional[DeviceItem]:
+    """Pick Internal Storage (or the first storage) of a device"""
+    log("Searching for Internal Storage...")
+    for item in storages:
+        log(f"Found: {item.name}")
+        item_name = item.name.lower()
+        if 'internal' in item_name or 'storage' in item_name:
+            return item
+
+    if storages:
+        # Try first item (usually Internal Storage)
+        log(f"Using first item: {storages[0].name}")
+        return storages[0]
+    return None
+
+
+def scan_photos(source: DeviceSource, storage: DeviceItem, settings: Dict,
+                log: Callable[..., None] = print_log) -> Iterator[Dict]:
+    """Yield the photo records of a storage, using the scan index if enabled"""
+    scan_index = None
+    try:
+        # Persistent index next to config.json, keyed by device and storage
+        index_view = None
+        if settings.get("use_scan_index", True):
+            try:
+                scan_index = ScanIndex(Path("scan_index.db"))
+                index_view = scan_index.view(source.name, storage.path)
+            except Exception as e:
+                log(f"Scan index unavailable: {e}", level=WARNING)
+
+        # Walk the storage once with a single probed access strategy
+        scanner = PhotoScanner(source, log,
+                               workers=settings.get("scan_workers", 4), index=index_view,
+                               deep_dates=settings.get("deep_date_scan", False),
+                               deep_budget=settings.get("deep_date_budget", 262144),
+                               deep_workers=settings.get("deep_date_workers", 4))
+        yield from scanner.iter_photos(storage)
+    finally:
+        if scan_index:
+            scan_index.close()
+
+
+# hachoir metadata keys holding a date, most specific first
+HACHOIR_DATE_KEYS = ('date_time_original', 'creation_date', 'last_modification')
+
+
+def hachoir_date(file_path: Path) -> Optional[datetime]:
+    """Date from a full hachoir parse, or None (requires hachoir)"""
+    # The parser owns an open file, close it on every path
+    parser = createParser(str(file_path))
+    if not parser:
+        return None
+    with parser:
+        metadata = extractMetadata(parser)
+        if not metadata:
+            return None
+        for key in HACHOIR_DATE_KEYS:
+            # has()/get() raise ValueError for keys this kind of metadata does not define
+            try:
+                if metadata.has(key):
+                    return metadata.get(key)
+            except ValueError:
+                continue
+    return None
+
+
+# Run settings a resume continues with
+RESUMED_SETTINGS = ("sort_mode", "output_base_path", "unknown_folder_path", "duplicate_mode")
+
+
+def resume_settings(run_settings: Dict) -> Dict:
+    """Settings from a journaled run that its resume must use, the source included
+
+    A run that read a local directory resumes from that directory and a
+    device run from the device; journals without the source keep the
+    configured one.
+    """
+    settings = {key: run_settings[key] for key in RESUMED_SETTINGS if run_settings.get(key) is not None}
+    if run_settings.get('source') == "local":
+        settings['local_source_path'] = run_settings.get('local_source_path') or ""
+    elif run_settings.get('source') == "device":
+        settings['local_source_path'] = ""
+    return settings
+
+
+def remove_staging(staging: Path):
+    """Remove a job's staging folder, and the folder above it once no other job uses it"""
+    for folder in (staging, staging.parent):
+        try:
+            folder.rmdir()
+        except OSError:
+            return
+
+
+def prepare_resume(pending: Dict[str, Dict], records_by_path: Dict[str, Dict],
+                   log: Callable[..., None] = print_log) -> Tuple[List[Dict], int, List[Tuple[str, Dict]]]:
+    """Match unfinished journal entries to scanned records
+
+    Returns (records to copy, missing count, stamped). Files that were
+    being written when the import stopped are incomplete and are removed
+    so they get copied again. Copied files whose times were never set get
+    them now and need no copy; they are returned as (path, entry) in
+    stamped, for the resumed run to journal as verified.
+    """
+    stamped = []
+    for path, entry in pending.items():
+        if entry['state'] == COPIED and Path(entry['dest']).exists():
+            try:
+                set_file_times(Path(entry['dest']), datetime.fromisoformat(entry['created']))
+                log(f"Set date of {Path(entry['dest']).name}", level=DEBUG)
+            except Exception as e:
+                log(f"  Warning: Could not preserve metadata of {entry['dest']}: {e}", level=WARNING)
+            stamped.append((path, entry))
+
+    done = {path for path, _ in stamped}
+    remaining = [path for path in pending if path not in done]
+    records = [records_by_path[path] for path in remaining if path in records_by_path]
+
+    for path, entry in pending.items():
+        if entry['state'] == STARTED and entry.get('dest'):
+            partial = Path(entry['dest'])
+            try:
+                partial.unlink()
+                log(f"Removed incomplete file: {entry['dest']}")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                log(f"Could not remove incomplete file {entry['dest']}: {e}", level=ERROR)
+            if partial.parent.parent.name == SHELL_STAGING_FOLDER:
+                remove_staging(partial.parent)
+
+    return records, len(remaining) - len(records), stamped
+
+
+class ImportJob(NamedTuple):
+    """Everything one import needs, fixed when it starts
+
+    Built on the thread that owns the settings (the Tk main loop), so the
+    engine never reads widgets or a config dict that is still being edited.
+    """
+    source: DeviceSource
+    records: Tuple[Dict, ...]
+    settings: Mapping
+    resume_run: Optional[str] = None
+    stamped: Tuple[Tuple[str, Dict], ...] = ()  # Files prepare_resume finished, journaled verified
+
+    @classmethod
+    def create(cls, source: DeviceSource, records: List[Dict], settings: Dict,
+               resume_run: Optional[str] = None, stamped: List[Tuple[str, Dict]] = ()) -> 'ImportJob':
+        """Snapshot records and settings into a job"""
+        return cls(source, tuple(records), MappingProxyType(dict(settings)), resume_run, tuple(stamped))
+
+
+class ImportEngine:
+    """Plans and runs imports (copy, verify, timestamp) without any UI
+
+    Used by the Tk app and by the command line. Settings use the
+    config.json keys. The destination index is kept between runs, so a
+    second import in the same session plans without rescanning the
+    output folders.
+
+    log receives progress lines; on_file, if given, receives a dict per
+    finished file (index, path, filename, state, dest, bytes, error and
+    the run's counters).
+    """
+
+    def __init__(self, log: Callable[..., None] = print_log, on_file: Callable[[Dict], None] = None):
+        self.log = log
+        self.on_file = on_file
+        self.source = None
+        self.settings = {}
+        self.column_cache = ShellColumnCache()  # Column indices of destination folders
+        self.transfer_journal = None  # Journal of the running import
+        self.content_index = None  # Content hashes of the output library (skip_identical_content)
+        self.destination_index = None  # Names and sizes of files in the destination folders
+        self.timestamp_batch = TimestampBatch()  # Times of Shell-copied files, applied after the run
+        self.unstamped_files = {}  # Copied file -> (source path, size) until the batch sets its times
+        self.scheduler = None
+
+    def cancel(self):
+        """Stop starting new transfers; running ones finish"""
+        if self.scheduler:
+            self.scheduler.cancel()
+
+    def get_destination_folder(self, photo_info: Dict) -> Path:
+        """Get destination folder based on sort mode (folders are created by the planner)"""
+        return destination_folder(photo_info.get('date', ''), self.settings.get("sort_mode", "Month_Year"),
+                                  self.settings.get("output_base_path", ""),
+                                  self.settings.get("unknown_folder_path", ""))
+
+    def get_destination_index(self) -> DestinationIndex:
+        """Index the output and unknown folders once; later imports reuse it"""
+        roots = [self.settings.get("output_base_path", ""), self.settings.get("unknown_folder_path", "")]
+        if self.destination_index is None or not self.destination_index.covers(roots):
+            start = time.perf_counter()
+            index = DestinationIndex(roots)
+            index.build()
+            self.log(f"Indexed {index.file_count} file(s) in the destination in {time.perf_counter() - start:.1f}s")
+            self.destination_index = index
+        return self.destination_index
+
+    def plan(self, job: ImportJob) -> Tuple[List[Tuple[Dict, Path]], List[Tuple[Dict, Path]]]:
+        """Destination of every record, split into (to copy, already present)"""
+        self.source = job.source
+        self.settings = job.settings
+        records = job.records
+
+        # Plan before touching the device: photos whose name and size are
+        # already in their destination folder are left out
+        entries = [(photo_info, self.get_destination_folder(photo_info)) for photo_info in records]
+        present = []
+        if self.settings.get("skip_already_present", True):
+            entries, present = plan_transfer(entries, self.get_destination_index(), self.source.EXACT_SIZES)
+        return entries, present
+
+    def run(self, job: ImportJob) -> Dict:
+        """Import the job's records and return a summary
+
+        The summary has moved, skipped, failed, errors ("name: error"
+        lines), bytes, elapsed and bytes_per_second.
+        """
+        self.source = source = job.source
+        self.settings = job.settings
+        records = job.records
+
+        # Write-ahead journal so an interrupted import can be resumed
+        try:
+            self.transfer_journal = TransferJournal(Path("transfer_journal.jsonl"))
+            if job.resume_run:
+                self.transfer_journal.resume_run(job.resume_run)
+            else:
+                local = isinstance(source, LocalDeviceSource)
+                self.transfer_journal.begin_run({
+                    "device": source.name,
+                    "source": "local" if local else "device",
+                    "local_source_path": self.settings.get("local_source_path", "") if local else "",
+                    "sort_mode": self.settings.get("sort_mode"),
+                    "output_base_path": self.settings.get("output_base_path"),
+                    "unknown_folder_path": self.settings.get("unknown_folder_path"),
+                    "duplicate_mode": self.settings.get("duplicate_mode"),
+                })
+            self.transfer_journal.record_many(QUEUED, [photo_info['path'] for photo_info in records])
+            for path, entry in job.stamped:
+                self._journal(VERIFIED, path, dest=entry['dest'], size=entry.get('size', 0))
+        except Exception as e:
+            self.log(f"Warning: Transfer journal unavailable, this import cannot be resumed: {e}", level=WARNING)
+            self.transfer_journal = None
+
+        try:
+            output_base = self.settings.get("output_base_path", "")
+
+            # Copies written by an import that never finished
+            cleared = clear_staging([output_base, self.settings.get("unknown_folder_path", "")])
+            if cleared:
+                self.log(f"Removed {cleared} incomplete file(s) left by an interrupted import")
+
+            # Identical-content detection needs the whole output library hashed
+            if self.settings.get("duplicate_mode") == "skip_identical_content":
+                self.log(f"Indexing output library {output_base}...")
+                self.content_index = ContentIndex(output_base, Path("content_index.db"))
+                stats = self.content_index.build(workers=self.settings.get("hash_workers", 8), log=self.log)
+                self.log(f"Output library: {stats['files']} file(s), {stats['hashed']} newly hashed, "
+                         f"{stats['removed']} removed")
+
+            entries, present = self.plan(job)
+            if present:
+                self.log(f"{len(present)} of {len(records)} photo(s) are already in the destination, skipping them")
+                for photo_info, existing in present:
+                    self._journal(SKIPPED, photo_info['path'], dest=str(existing))
+
+            # Create every destination folder up front, once each
+            created = create_folders(dest_folder for _, dest_folder in entries)
+            if created:
+                self.log(f"Created {created} destination folder(s)")
+
+            # One job per photo; jobs for the same target name in the same
+            # folder share a key so they never run at the same time
+            jobs = []
+            for idx, (photo_info, dest_folder) in enumerate(entries, 1):
+                key = (str(dest_folder).lower(), photo_info['filename'].lower())
+                jobs.append(CopyJob(idx, key, photo_info.get('size', 0), (photo_info, dest_folder)))
+
+            # Each copy worker initializes COM (or other per-thread state) itself
+            self.scheduler = CopyScheduler(self.transfer_photo,
+                                           max_workers=self.settings.get("copy_workers", 4),
+                                           auto_tune=self.settings.get("copy_auto_tune", True),
+                                           thread_init=source.thread_init,
+                                           thread_uninit=source.thread_uninit,
+                                           on_done=self._file_done if self.on_file else None)
+            self.log(f"Copying {len(jobs)} file(s) with up to {self.scheduler.max_workers} transfers in flight...")
+            progress = self.scheduler.run(jobs)
+            totals = progress.snapshot()
+
+            # Stamp the files the Shell copied, all at once
+            self._apply_timestamps()
+
+            summary = {
+                'moved': totals['moved'],
+                'skipped': totals['skipped'] + len(present),
+                'failed': totals['failed'],
+                'errors': [f"{job.payload[0]['filename']}: {job.error}" for job in jobs if job.state == FAILED],
+                'bytes': totals['bytes_done'],
+                'elapsed': totals['elapsed'],
+                'bytes_per_second': totals['bytes_per_second'],
+            }
+
+            # Summary
+            self.log(f"\n{'='*60}")
+            self.log(f"SUMMARY:")
+            self.log(f"  ✓ Moved: {summary['moved']}")
+            self.log(f"  ⊘ Skipped: {summary['skipped']}")
+            self.log(f"  ✗ Errors: {summary['failed']}")
+            self.log(f"  Transferred {format_size(summary['bytes'])} in {summary['elapsed']:.1f}s "
+                     f"({format_size(summary['bytes_per_second'])}/s)")
+
+            # Show error details if any
+            if summary['errors']:
+                self.log(f"\nERROR DETAILS:", level=ERROR)
+                for error in summary['errors']:
+                    self.log(f"  • {error}", level=ERROR)
+
+            self.log(f"{'='*60}\n")
+            return summary
+        finally:
+            self.scheduler = None
+            # Files copied before an error still get their times
+            self._apply_timestamps()
+            if self.transfer_journal:
+                self.transfer_journal.close()
+                self.transfer_journal = None
+            if self.content_index:
+                self.content_index.close()
+                self.content_index = None
+
+    def _apply_timestamps(self):
+        """Set the times of the Shell-copied files and journal them verified"""
+        if not len(self.timestamp_batch):
+            return
+        updated, failed = self.timestamp_batch.apply()
+        self.log(f"Set dates of {len(updated)} file(s)")
+        for path, error in failed:
+            self.log(f"  Warning: Could not preserve metadata of {path.name}: {error}", level=WARNING)
+        if self.content_index:
+            for path in updated:
+                self.content_index.add(path)
+
+        # Setting the times again would not fix a failure, so those are done too
+        for path in updated + [path for path, _ in failed]:
+            source_path, size = self.unstamped_files.pop(path, (None, 0))
+            if source_path:
+                self._journal(VERIFIED, source_path, dest=str(path), size=size)
+
+    def _journal(self, state: str, path: str, **fields):
+        """Record a file state in the running import's journal, if any"""
+        if self.transfer_journal:
+            try:
+                self.transfer_journal.record(state, path, **fields)
+            except Exception as e:
+                self.log(f"  Warning: Could not write transfer journal: {e}", level=WARNING)
+
+    def _file_done(self, job: CopyJob, progress: TransferProgress):
+        """Report a finished job to on_file"""
+        photo_info = job.payload[0]
+        event = {
+            'index': job.index,
+            'path': photo_info['path'],
+            'filename': photo_info['filename'],
+            'state': job.state,
+            'dest': str(job.dest) if job.dest else None,
+            'bytes': job.bytes_done,
+            'error': job.error,
+        }
+        event.update(progress.snapshot())
+        self.on_file(event)
+
+    def device_item(self, photo_info: Dict) -> DeviceItem:
+        """Device item of a record, looked up again if the record has none (catalog rows)"""
+        item = photo_info.get('item')
+        if item is None:
+            item = self.source.resolve(photo_info['path'], photo_info['filename'],
+                                       photo_info['folder_path'], photo_info.get('folder_name', ""))
+        return item
+
+    def transfer_photo(self, job: CopyJob, progress: TransferProgress) -> Tuple[str, int, str]:
+        """Copy one photo (runs on a copy worker); returns (state, bytes, error)"""
+        photo_info, dest_folder = job.payload
+        filename = photo_info['filename']
+        source_path = photo_info['path']
+
+        try:
+            device_item = self.device_item(photo_info)
+            remaining = progress.total_files - progress.files_done
+            self.log(f"[{job.index}/{progress.total_files}] Moving {filename} to {dest_folder}... ({remaining} remaining)")
+
+            # Handle duplicate files based on config
+            expected_file = dest_folder / filename
+            duplicate_mode = self.settings.get("duplicate_mode", "overwrite")
+
+            if expected_file.exists():
+                if duplicate_mode == "skip":
+                    self.log(f"  ⊘ Skipped: {filename} (already exists)")
+                    self._journal(SKIPPED, source_path)
+                    return SKIPPED, 0, ""
+                elif duplicate_mode == "overwrite":
+                    # Replaced only once the copy is complete
+                    self.log(f"  File exists, overwriting...", level=DEBUG)
+                elif duplicate_mode in ("keep_both", "skip_identical_content"):
+                    # Same name doesn't mean same photo (iOS reuses IMG_0001 after 9999),
+                    # so identical content is detected after the copy instead
+                    # Find available filename
+                    counter = 1
+                    stem = expected_file.stem
+                    suffix = expected_file.suffix
+                    while expected_file.exists():
+                        expected_file = dest_folder / f"{stem}_{counter}{suffix}"
+                        counter += 1
+                    self.log(f"  File exists, renaming to {expected_file.name}...", level=DEBUG)
+                    # Both copy paths move their finished file to this name
+
+            self.log(f"  Copying {filename}...", level=DEBUG)
+
+            # Preferred path: read the source as a stream into a partial
+            # file next to the final name; falls back to the Shell copy if no
+            # stream is available. The file being written is journaled so a
+            # resume can remove a half-written one
+            copy_method = self.settings.get("copy_method", "stream")
+            size = None
+            if copy_method == "stream":
+                self._journal(STARTED, source_path, dest=str(partial_path(expected_file)))
+                size = self._copy_via_stream(job, progress, device_item, expected_file, photo_info)
+
+            # Stream copies are stamped through their own handle; files
+            # written by the Shell are stamped together at the end of the run
+            stamped = size is not None
+            if stamped:
+                final_file = expected_file
+            else:
+                # The Shell copy writes under the original name, into an empty
+                # staging folder: with the name already in the library, the
+                # old file could otherwise pass for the finished copy
+                staging = dest_folder / SHELL_STAGING_FOLDER / str(job.index)
+                copied_file = staging / filename
+                self._journal(STARTED, source_path, dest=str(copied_file))
+                try:
+                    staging.mkdir(parents=True, exist_ok=True)
+                    if copied_file.exists():
+                        # Left over from an interrupted run
+                        copied_file.unlink()
+                    self.source.copy_to(device_item, staging)
+                except IOError as e:
+                    self.log(f"✗ {e}", level=ERROR)
+                    self._journal(FAILED, source_path, error=str(e))
+                    return FAILED, 0, str(e)
+
+                # Wait for the copy to complete (reacts to folder change
+                # notifications where available instead of fixed sleeps)
+                try:
+                    size = wait_for_copy(copied_file, photo_info.get('size', 0), timeout=120,
+                                         on_wait=lambda waited: self.log(
+                                             f"  Still copying {filename}... ({waited:.0f}s)", level=DEBUG))
+                except TimeoutError as e:
+                    self.log(f"✗ {e}", level=ERROR)
+                    self._journal(FAILED, source_path, error=str(e))
+                    return FAILED, 0, str(e)
+
+                # Move into place under the name chosen above (replacing
+                # the old file in overwrite mode)
+                os.replace(copied_file, expected_file)
+                final_file = expected_file
+                remove_staging(staging)
+
+            # Drop the copy if the library already holds the same content
+            if self.content_index:
+                identical = self.content_index.find_identical(final_file)
+                if identical:
+                    final_file.unlink()
+                    self.log(f"  ⊘ Skipped: {filename} (identical to {identical})")
+                    self._journal(SKIPPED, source_path)
+                    return SKIPPED, size, ""
+
+            # Preserve metadata
+            file_date = None
+            if not stamped:
+                try:
+                    file_date = self.resolve_file_date(device_item, final_file, photo_info)
+                    if file_date:
+                        self.timestamp_batch.add(final_file, file_date)
+                except Exception as e:
+                    self.log(f"  Warning: Could not preserve metadata: {e}", level=WARNING)
+
+            # Index after stamping so the entry matches the file on disk
+            # (batched files are indexed again once their times are set)
+            if self.content_index:
+                self.content_index.add(final_file)
+            if self.destination_index:
+                self.destination_index.add(final_file, size)
+
+            job.dest = final_file
+            self.log(f"✓ Moved: {final_file.name} ({format_size(size)})")
+            if file_date:
+                # Verified once the batch has set its times; until then a
+                # resume sets them from the journal
+                self.unstamped_files[final_file] = (source_path, size)
+                self._journal(COPIED, source_path, dest=str(final_file), size=size, created=file_date.isoformat())
+            else:
+                self._journal(VERIFIED, source_path, dest=str(final_file), size=size)
+            return MOVED, size, ""
+
+        except Exception as copy_error:
+            error_msg = str(copy_error)
+            self.log(f"✗ Copy error: {error_msg}", level=ERROR)
+            self._journal(FAILED, source_path, error=error_msg)
+            return FAILED, 0, error_msg
+
+    def _copy_via_stream(self, job: CopyJob, progress: TransferProgress, device_item: DeviceItem,
+                         dest_file: Path, photo_info: Dict) -> Optional[int]:
+        """Copy a file by streaming it into dest_file; None if the source has no stream
+
+        The file's timestamps are set through the handle that wrote it,
+        before it is closed and moved to dest_file.
+        """
+        try:
+            src = self.source.open_stream(device_item)
+        except Exception as e:
+            self.log(f"  Stream not available ({e}), using Shell copy...", level=DEBUG)
+            return None
+
+        def stamp(out):
+            try:
+                file_date = self.resolve_file_date(device_item, dest_file, photo_info, opened=out)
+                if file_date:
+                    set_open_file_times(out, file_date)
+            except Exception as e:
+                self.log(f"  Warning: Could not preserve metadata: {e}", level=WARNING)
+
+        with src:
+            return copy_stream(src, dest_file, on_progress=lambda written: progress.update_bytes(job, written),
+                               finish=stamp)
+
+    def get_media_creation_date_from_file(self, file_path: Path):
+        """Get media creation date from copied file using Shell"""
+        if not WINDOWS_SUPPORT:
+            return None
+
+        try:
+            shell = win32com.client.Dispatch("Shell.Application")
+            folder = shell.NameSpace(str(file_path.parent))
+            file_item = folder.ParseName(file_path.name)
+
+            if file_item:
+                # Try different columns that might contain media creation date;
+                # column indices are resolved by header name once per folder
+                for col in ["Media created", "Date taken", "Date created", "Date modified"]:
+                    try:
+                        detail = self.column_cache.get_details(folder, str(file_path.parent), file_item, (col,)).get(col)
+                        if detail:
+                            dt = parse_date(detail)
+                            if dt:
+                                self.log(f"  Found media date (col {col}): {detail}", level=DEBUG)
+                                return dt
+                    except:
+                        continue
+        except Exception as e:
+            pass
+
+        return None
+
+    def get_media_creation_date(self, file_path: Path):
+        """Extract media creation date from video/photo file"""
+        # Header-only reader for JPEG/HEIC EXIF and MOV/MP4 atoms
+        media_date = read_file_date(file_path)
+        if media_date:
+            return media_date
+
+        # Other formats: full hachoir parse
+        if not HACHOIR_AVAILABLE:
+            return None
+        try:
+            return hachoir_date(file_path)
+        except Exception:
+            return None
+
+    def resolve_file_date(self, item: DeviceItem, dest_file: Path, photo_info: Optional[Dict] = None,
+                          opened=None) -> Optional[datetime]:
+        """Pick the date to stamp a copied file with
+
+        Media headers first (read through `opened` while the copy still has
+        the file open), then the Shell on the destination, then the device's
+        date columns and finally the folder date of the photo record.
+        """
+        # Method 1: Try to read metadata from the copied file
+        self.log(f"  Reading file metadata...", level=DEBUG)
+
+        if opened is not None:
+            # EXIF / QuickTime headers through the handle that wrote the file
+            opened.seek(0)
+            media_date = read_stream_date(opened)
+        else:
+            # First try: EXIF / QuickTime headers (falls back to hachoir)
+            media_date = self.get_media_creation_date(dest_file)
+
+            # Second try: Windows Shell GetDetailsOf on copied file
+            if not media_date:
+                media_date = self.get_media_creation_date_from_file(dest_file)
+
+        if media_date:
+            self.log(f"  ✓ Date from media metadata: {media_date.strftime('%Y-%m-%d %H:%M:%S')}", level=DEBUG)
+            return media_date
+
+        # Method 2: Try to get date from MTP metadata columns
+        # (only the date fields are looked up, column indices are cached per folder)
+        for col, detail in self.source.get_metadata(item, DATE_FIELDS).items():
+            date_modified = parse_date(detail)
+            if date_modified:
+                self.log(f"  ✓ Found date in column {col}: {detail}", level=DEBUG)
+                return date_modified
+
+        # Fallback: Use folder name date
+        if photo_info and photo_info.get('date') != "Unknown":
+            date_str = photo_info['date']
+            try:
+                dt = datetime.strptime(date_str, "%Y-%m-%d").replace(hour=12, minute=0, second=0)
+                self.log(f"  Date from folder: {date_str}", level=DEBUG)
+                return dt
+            except ValueError as e:
+                self.log(f"  Could not set date: {e}", level=WARNING)
+
+        self.log(f"  Warning: No date found, file will have current date", level=WARNING)
+        return None
+
+
+class ImportRunner:
+    """Runs ImportJobs on a background thread and reports through a queue
+
+    Events are (kind, payload) tuples: ('log', (message, level)), ('file', file
+    event), then ('done', summary) or ('error', message) once the job is
+    over. Nothing here touches the UI; the GUI drains `events` from its
+    own loop. The engine (and its destination index) lives as long as
+    the runner.
+    """
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.engine = ImportEngine(log=lambda message, level=INFO: self.events.put(('log', (message, level))),
+                                   on_file=lambda event: self.events.put(('file', event)))
+        self.thread = None
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, job: ImportJob):
+        """Start importing job; only one job runs at a time"""
+        if self.running:
+            raise RuntimeError("An import is already running")
+        self.thread = threading.Thread(target=self._run, args=(job,), daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Stop starting new transfers; running ones finish"""
+        self.engine.cancel()
+
+    def _run(self, job: ImportJob):
+        try:
+            self.events.put(('done', self.engine.run(job)))
+        except Exception as e:
+            self.events.put(('error', str(e)))
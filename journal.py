@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from transfer import SKIPPED
+
+
+# Per-file journal states, in the order a file goes through them
+# (queued, skipped and failed come from transfer.py)
+STARTED = "started"
+COPIED = "copied"  # In place, but its times are still to be set (Shell copies)
+VERIFIED = "verified"
+
+FINISHED_STATES = (VERIFIED, SKIPPED)
+
+
+class TransferJournal:
+    """Append-only, write-ahead journal of one import run
+
+    Every line is a JSON record. A run starts with a "run" record holding
+    its settings, followed by per-file records moving each source path
+    through queued -> started -> (copied ->) verified/skipped/failed.
+    A copied record holds the times still to be set on the file, so a
+    resume can set them if the run stopped before doing so. Lines are
+    flushed as they are written and fsync'd in batches (every
+    sync_every records or sync_interval seconds) so a crash loses at most
+    the last batch, which is then simply redone on resume.
+    """
+
+    def __init__(self, path: str = "transfer_journal.jsonl", sync_every: int = 64,
+                 sync_interval: float = 1.0):
+        self.path = Path(path)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.run_id = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def begin_run(self, settings: Dict) -> str:
+        """Start a new run, replacing the previous journal"""
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self.run_id = uuid.uuid4().hex
+        self._write({'event': 'run', 'run': self.run_id, 'time': time.time(), 'settings': settings}, sync=True)
+        return self.run_id
+
+    def resume_run(self, run_id: str):
+        """Continue appending to an interrupted run"""
+        # Terminate a line torn by a crash so it can't swallow the next record
+        torn = False
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b'\n'
+
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if torn:
+            self._file.write('\n')
+        self.run_id = run_id
+        self._write({'event': 'resume', 'run': run_id, 'time': time.time()}, sync=True)
+
+    def record(self, state: str, path: str, **fields):
+        """Record a state change of one source file"""
+        entry = {'event': state, 'path': path}
+        entry.update(fields)
+        self._write(entry)
+
+    def record_many(self, state: str, paths, **fields):
+        """Record the same state for many files with a single sync"""
+        with self._lock:
+            for path in paths:
+                entry = {'event': state, 'path': path}
+                entry.update(fields)
+                self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def _write(self, entry: Dict, sync: bool = False):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._unsynced += 1
+            if sync or self._unsynced >= self.sync_every or \
+                    time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+
+def load_last_run(path: str = "transfer_journal.jsonl") -> Optional[Dict]:
+    """Replay the journal into {'run', 'settings', 'files': {path: entry}}
+
+    Each file entry holds the latest state and fields recorded for it.
+    A torn last line (crash mid-write) is ignored.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+
+    run = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+
+            event = entry.get('event')
+            if event == 'run':
+                run = {'run': entry['run'], 'settings': entry.get('settings', {}), 'files': {}}
+            elif event == 'resume' or run is None:
+                continue
+            else:
+                file_entry = run['files'].setdefault(entry['path'], {})
+                file_entry.update(entry)
+                file_entry['state'] = event
+
+    return run
+
+
+def unfinished_files(run: Dict) -> Dict[str, Dict]:
+    """Files of a replayed run that still need to be transferred"""
+    return {path: entry for path, entry in run['files'].items()
+            if entry['state'] not in FINISHED_STATES}
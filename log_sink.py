@@ -0,0 +1,99 @@
+import collections
+import logging
+import logging.handlers
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+# config.json "log_level" values
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+
+
+def level_from_name(name: str, default: int = INFO) -> int:
+    return LEVELS.get(str(name).lower(), default)
+
+
+def print_log(message: str, level: int = INFO):
+    """Default log callback: print every message
+
+    Log callbacks throughout the app are called as log(message) or
+    log(message, level=...); the level is INFO unless the caller says
+    otherwise (DEBUG for per-file detail).
+    """
+    print(message)
+
+
+class LogSink:
+    """Thread-safe log buffer between the app and the log widget
+
+    write() only appends to memory (and the log file), so it is cheap
+    from any thread. The UI takes the lines written since its last flush
+    with take_pending() on a timer and inserts them in one go. The last
+    max_lines messages of every level are kept in a ring buffer, so a
+    change of verbosity can redraw the view. Every line also goes to a
+    rotating file when one is set.
+    """
+
+    def __init__(self, max_lines: int = 5000, level: int = INFO, file_path: Optional[Path] = None,
+                 max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3):
+        self.max_lines = max(1, max_lines)
+        self.level = level
+        self.lines = collections.deque(maxlen=self.max_lines)  # (level, line) of every message
+        self._pending = collections.deque(maxlen=self.max_lines)
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+        self._file_logger = None
+        if file_path:
+            handler = logging.handlers.RotatingFileHandler(str(file_path), maxBytes=max_bytes,
+                                                           backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s"))
+            self._file_logger = logging.getLogger(f"{__name__}.{id(self)}")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(DEBUG)
+            self._file_logger.addHandler(handler)
+
+    def write(self, message: str, level: int = INFO):
+        """Record a message; it is shown if its level passes the verbosity"""
+        if self._file_logger:
+            self._file_logger.log(level, message.strip("\n"))
+
+        line = f"{datetime.now().strftime('%H:%M:%S')} - {message}"
+        with self._lock:
+            self.lines.append((level, line))
+            if level < self.level:
+                return
+            if len(self._pending) == self._pending.maxlen:
+                self._dropped += 1
+            self._pending.append(line)
+
+    def take_pending(self) -> Tuple[List[str], int]:
+        """Lines written since the last call, and how many were dropped before being taken"""
+        with self._lock:
+            lines = list(self._pending)
+            dropped = self._dropped
+            self._pending.clear()
+            self._dropped = 0
+        return lines, dropped
+
+    def set_level(self, level: int) -> List[str]:
+        """Change the verbosity; returns the buffered lines to show from now on"""
+        with self._lock:
+            self.level = level
+            self._pending.clear()
+            self._dropped = 0
+            return [line for line_level, line in self.lines if line_level >= level]
+
+    def close(self):
+        if self._file_logger:
+            for handler in list(self._file_logger.handlers):
+                handler.close()
+                self._file_logger.removeHandler(handler)
+            self._file_logger = None
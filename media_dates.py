@@ -0,0 +1,319 @@
+import struct
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from dateparse import parse_date
+
+
+# EXIF tags, in order of preference
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+
+# Largest metadata block read into memory (APP1 is at most 64 KB)
+MAX_BLOCK_SIZE = 1024 * 1024
+
+# Default read budget of read_stream_date: more than any header needs
+# (movie data is skipped with seek, not read)
+DEFAULT_READ_BUDGET = 4 * 1024 * 1024
+
+# QuickTime times count seconds from 1904-01-01 UTC
+QUICKTIME_EPOCH = datetime(1904, 1, 1)
+
+
+def read_file_date(path: Path) -> Optional[datetime]:
+    """Capture date of a local file, or None if it has none we can read"""
+    try:
+        with open(path, 'rb') as f:
+            return read_media_date(f)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def read_stream_date(f, budget: int = DEFAULT_READ_BUDGET) -> Optional[datetime]:
+    """Capture date from a (device) stream, reading at most budget bytes
+
+    Seeks are free; only bytes actually read count against the budget.
+    Returns None when the date is not within reach.
+    """
+    try:
+        return read_media_date(_BudgetReader(f, budget))
+    except (ValueError, struct.error):
+        return None
+
+
+class _BudgetReader:
+    """File object wrapper that refuses to read past a byte budget"""
+
+    def __init__(self, f, budget: int):
+        self.f = f
+        self.remaining = budget
+
+    def read(self, size: int) -> bytes:
+        if size > self.remaining:
+            raise ValueError("Read budget exhausted")
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.f.seek(offset, whence)
+
+
+def read_media_date(f) -> Optional[datetime]:
+    """Capture date from a seekable binary file object, sniffing the format
+
+    Reads only the structures that hold the date: the JPEG APP1 segment,
+    the HEIF Exif item found through meta/iinf/iloc, or the moov/mvhd and
+    udta/(c)day atoms of a movie. Image data and mdat are skipped with
+    seek, so the cost does not grow with file size. Raises
+    ValueError/struct.error on malformed data.
+    """
+    head = f.read(12)
+    if head[:2] == b'\xff\xd8':
+        return _jpeg_date(f)
+    if head[4:8] == b'ftyp':
+        return _isobmff_date(f)
+    return None
+
+
+def _read_exact(f, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Unexpected end of file")
+    return data
+
+
+# JPEG
+
+def _jpeg_date(f) -> Optional[datetime]:
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            # Markers without a length
+            continue
+        if code in (0xD9, 0xDA):
+            # End of image / start of scan: no more metadata
+            return None
+
+        length = struct.unpack('>H', _read_exact(f, 2))[0]
+        if length < 2:
+            return None
+        if code == 0xE1:
+            data = _read_exact(f, length - 2)
+            if data.startswith(b'Exif\x00\x00'):
+                return _tiff_date(data[6:])
+        else:
+            f.seek(length - 2, 1)
+
+
+# TIFF / EXIF
+
+def _tiff_date(data: bytes) -> Optional[datetime]:
+    """Date from an EXIF TIFF block (DateTimeOriginal, then Digitized, then DateTime)"""
+    if data[:2] == b'II':
+        order = '<'
+    elif data[:2] == b'MM':
+        order = '>'
+    else:
+        return None
+    if struct.unpack(order + 'H', data[2:4])[0] != 42:
+        return None
+
+    ifd0 = _read_ifd(data, order, struct.unpack(order + 'I', data[4:8])[0])
+    exif = {}
+    if TAG_EXIF_IFD in ifd0:
+        exif = _read_ifd(data, order, ifd0[TAG_EXIF_IFD])
+
+    for tags, tag in ((exif, TAG_DATETIME_ORIGINAL), (exif, TAG_DATETIME_DIGITIZED), (ifd0, TAG_DATETIME)):
+        value = tags.get(tag)
+        if isinstance(value, str):
+            date = parse_date(value)
+            if date:
+                return date
+    return None
+
+
+def _read_ifd(data: bytes, order: str, offset: int) -> dict:
+    """Read the ASCII and LONG entries of one IFD that we care about"""
+    entries = {}
+    if offset + 2 > len(data):
+        return entries
+    count = struct.unpack_from(order + 'H', data, offset)[0]
+    for i in range(count):
+        pos = offset + 2 + 12 * i
+        if pos + 12 > len(data):
+            break
+        tag, kind, n, value = struct.unpack_from(order + 'HHI4s', data, pos)
+        if tag == TAG_EXIF_IFD and kind == 4:
+            entries[tag] = struct.unpack(order + 'I', value)[0]
+        elif tag in (TAG_DATETIME_ORIGINAL, TAG_DATETIME_DIGITIZED, TAG_DATETIME) and kind == 2:
+            if n <= 4:
+                raw = value[:n]
+            else:
+                start = struct.unpack(order + 'I', value)[0]
+                raw = data[start:start + n]
+            entries[tag] = raw.split(b'\x00', 1)[0].decode('ascii', 'replace')
+    return entries
+
+
+# ISO base media (HEIC, MOV, MP4)
+
+def _boxes(f, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload start, payload end) of the boxes in [start, end)"""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', _read_exact(f, 8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size:
+            return
+        yield kind, pos + header_size, min(pos + size, end)
+        pos += size
+
+
+def _find_box(f, start: int, end: int, kind: bytes) -> Optional[Tuple[int, int]]:
+    for box_kind, box_start, box_end in _boxes(f, start, end):
+        if box_kind == kind:
+            return box_start, box_end
+    return None
+
+
+def _isobmff_date(f) -> Optional[datetime]:
+    end = f.seek(0, 2)
+    top = {}
+    for kind, start, box_end in _boxes(f, 0, end):
+        if kind in (b'moov', b'meta') and kind not in top:
+            top[kind] = (start, box_end)
+
+    if b'moov' in top:
+        return _movie_date(f, *top[b'moov'])
+    if b'meta' in top:
+        return _heif_date(f, *top[b'meta'])
+    return None
+
+
+def _movie_date(f, start: int, end: int) -> Optional[datetime]:
+    """mvhd creation time (UTC, as hachoir reports it), else the udta (c)day string"""
+    mvhd = _find_box(f, start, end, b'mvhd')
+    if mvhd:
+        f.seek(mvhd[0])
+        version = _read_exact(f, 4)[0]
+        if version == 1:
+            created = struct.unpack('>Q', _read_exact(f, 8))[0]
+        else:
+            created = struct.unpack('>I', _read_exact(f, 4))[0]
+        if created:
+            return QUICKTIME_EPOCH + timedelta(seconds=created)
+
+    udta = _find_box(f, start, end, b'udta')
+    if udta:
+        day = _find_box(f, udta[0], udta[1], b'\xa9day')
+        if day:
+            f.seek(day[0])
+            length = struct.unpack('>H', _read_exact(f, 4)[:2])[0]
+            text = _read_exact(f, min(length, day[1] - day[0] - 4)).decode('utf-8', 'replace')
+            # 2024-01-15T13:45:00+0100 -> drop the zone
+            return parse_date(text[:19].replace('T', ' '))
+    return None
+
+
+def _heif_date(f, start: int, end: int) -> Optional[datetime]:
+    """Find the Exif item through iinf/iloc and read its TIFF block"""
+    start += 4  # meta is a full box (version + flags)
+    iinf = _find_box(f, start, end, b'iinf')
+    iloc = _find_box(f, start, end, b'iloc')
+    if not iinf or not iloc:
+        return None
+
+    item_id = _exif_item_id(f, *iinf)
+    if item_id is None:
+        return None
+    location = _item_location(f, *iloc, item_id)
+    if location is None:
+        return None
+
+    offset, length = location
+    if length < 4 or length > MAX_BLOCK_SIZE:
+        return None
+    f.seek(offset)
+    data = _read_exact(f, length)
+    # Exif item data starts with the offset of the TIFF header
+    tiff_offset = 4 + struct.unpack('>I', data[:4])[0]
+    return _tiff_date(data[tiff_offset:])
+
+
+def _exif_item_id(f, start: int, end: int) -> Optional[int]:
+    f.seek(start)
+    version = _read_exact(f, 4)[0]
+    header = 4 + (2 if version == 0 else 4)
+    for kind, box_start, box_end in _boxes(f, start + header, end):
+        if kind != b'infe':
+            continue
+        f.seek(box_start)
+        infe_version = _read_exact(f, 4)[0]
+        if infe_version < 2:
+            continue
+        if infe_version == 2:
+            item_id = struct.unpack('>H', _read_exact(f, 2))[0]
+        else:
+            item_id = struct.unpack('>I', _read_exact(f, 4))[0]
+        f.seek(2, 1)  # item_protection_index
+        if _read_exact(f, 4) == b'Exif':
+            return item_id
+    return None
+
+
+def _read_uint(f, size: int) -> int:
+    if size == 0:
+        return 0
+    return int.from_bytes(_read_exact(f, size), 'big')
+
+
+def _item_location(f, start: int, end: int, wanted: int) -> Optional[Tuple[int, int]]:
+    """File offset and length of the first extent of an item (construction method 0)"""
+    f.seek(start)
+    version = _read_exact(f, 4)[0]
+    sizes = _read_exact(f, 2)
+    offset_size, length_size = sizes[0] >> 4, sizes[0] & 0x0F
+    base_offset_size = sizes[1] >> 4
+    index_size = sizes[1] & 0x0F if version in (1, 2) else 0
+    item_count = _read_uint(f, 2 if version < 2 else 4)
+
+    for _ in range(item_count):
+        item_id = _read_uint(f, 2 if version < 2 else 4)
+        construction_method = _read_uint(f, 2) & 0x0F if version in (1, 2) else 0
+        f.seek(2, 1)  # data_reference_index
+        base_offset = _read_uint(f, base_offset_size)
+        extent_count = _read_uint(f, 2)
+        extents = []
+        for _ in range(extent_count):
+            _read_uint(f, index_size)
+            extents.append((_read_uint(f, offset_size), _read_uint(f, length_size)))
+        if item_id == wanted:
+            if construction_method != 0 or not extents:
+                return None
+            extent_offset, extent_length = extents[0]
+            return base_offset + extent_offset, extent_length
+    return None
@@ -0,0 +1,256 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from catalog import PhotoCatalog
+from selection import SelectionSet
+
+
+CHECKED = "☑"
+UNCHECKED = "□"
+
+
+class PhotoListModel:
+    """Scanned photos and their selection, addressed by row index
+
+    The list widget only reads rows from here; the photos are kept in a
+    columnar catalog and which ones are checked in a bitset, rather than
+    in the widget. Rows are shown in scan order unless sort() set an
+    order; the widget addresses display lines and row_at_line() maps them
+    to rows.
+    """
+
+    def __init__(self):
+        self.catalog = PhotoCatalog()
+        self.selected = SelectionSet()
+        self.order = None  # Row shown on each line when sorted, None for scan order
+        self.sort_column = None
+        self.sort_reverse = False
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    @property
+    def selected_count(self) -> int:
+        return self.selected.count
+
+    def clear(self):
+        self.catalog.clear()
+        self.selected.clear()
+        self.order = None
+        self.sort_column = None
+        self.sort_reverse = False
+
+    def append(self, record: Dict) -> int:
+        """Add a scanned photo record; returns its row (shown last until the next sort)"""
+        row = self.catalog.append(record)
+        self.selected.append()
+        if self.order is not None:
+            self.order.append(row)
+        return row
+
+    def row_at_line(self, line: int) -> int:
+        return self.order[line] if self.order is not None else line
+
+    def sort(self, column: Optional[str], reverse: bool = False):
+        """Show rows ordered by a catalog column (see SORT_COLUMNS), or in scan order for None"""
+        self.order = self.catalog.sort_order(column, reverse) if column else None
+        self.sort_column = column
+        self.sort_reverse = reverse
+
+    def find(self, path: str) -> Optional[int]:
+        """Row of the photo with this device path"""
+        return self.catalog.find(path)
+
+    def record(self, row: int) -> Dict:
+        """Photo record of a row (built on demand, without a device item)"""
+        return self.catalog.record(row)
+
+    def toggle(self, row: int):
+        self.selected.toggle(row)
+
+    def select_range(self, first: int, last: int, selected: bool = True):
+        """Check (or uncheck) the rows shown on lines first..last, inclusive, in either order"""
+        if first > last:
+            first, last = last, first
+        if self.order is None:
+            self.selected.set_range(first, last + 1, selected)
+        else:
+            for row in self.order[first:last + 1]:
+                self.selected.set(row, selected)
+
+    def select_matching(self, flags: bytes, selected: bool = True):
+        """Check (or uncheck) the rows flagged by PhotoCatalog.match()"""
+        self.selected.set_flags(flags, selected)
+
+    def select_all(self, selected: bool = True):
+        self.selected.set_all(selected)
+
+    def invert_selection(self):
+        self.selected.invert()
+
+    def selected_flags(self) -> bytes:
+        """One byte per row, 1 where the row is checked (as PhotoCatalog.match returns)"""
+        return self.selected.flags()
+
+    def selected_rows(self) -> List[int]:
+        return self.selected.rows()
+
+
+class VirtualPhotoList(ttk.Frame):
+    """Photo list that only creates tree items for the rows on screen
+
+    A Treeview holds a small pool of items, one per visible line; scrolling
+    moves a window over the model and rewrites the pool's values, so the
+    cost of drawing does not depend on how many photos are loaded. Clicks
+    on the first column toggle the row in the model (shift-click checks a
+    range), then on_change is called. Clicking the heading of a column
+    listed in sort_columns sorts by its catalog column (again to reverse).
+    """
+
+    def __init__(self, parent, model: PhotoListModel, columns: Sequence[Tuple[str, str, int]],
+                 format_row: Callable[[Dict], Tuple], on_change: Callable[[], None] = None,
+                 sort_columns: Optional[Dict[str, str]] = None):
+        super().__init__(parent)
+        self.model = model
+        self.format_row = format_row
+        self.on_change = on_change
+        self.sort_columns = sort_columns or {}  # Tree column -> catalog column
+        self.headings = {column: heading for column, heading, _ in columns}
+        self.offset = 0  # Display line shown at the top
+        self.pool: List[str] = []  # Tree item ids, one per visible line
+        self.last_clicked = None
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(self, columns=[column for column, _, _ in columns],
+                                 show="tree headings", height=15, selectmode="none")
+        self.tree.heading("#0", text="Select")
+        self.tree.column("#0", width=60, anchor="center", stretch=False)
+        for column, heading, width in columns:
+            if column in self.sort_columns:
+                self.tree.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            else:
+                self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        try:
+            self.row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        except (tk.TclError, ValueError):
+            self.row_height = 20
+        self._resize_pool(15)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<Shift-Button-1>", self._on_shift_click)
+        # Wheel events scroll the list instead of the page around it
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+
+    @property
+    def visible_rows(self) -> int:
+        return len(self.pool)
+
+    def refresh(self):
+        """Redraw the visible rows and the scrollbar (after the model changed)"""
+        total = len(self.model)
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        for line, item in enumerate(self.pool):
+            if self.offset + line < total:
+                row = self.model.row_at_line(self.offset + line)
+                glyph = CHECKED if row in self.model.selected else UNCHECKED
+                self.tree.item(item, text=glyph, values=self.format_row(self.model.record(row)))
+            else:
+                self.tree.item(item, text="", values=())
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def line_at(self, y: int) -> Optional[int]:
+        """Display line under a y coordinate of the tree, if it shows a photo"""
+        item = self.tree.identify_row(y)
+        if not item or item not in self.pool:
+            return None
+        line = self.offset + self.pool.index(item)
+        return line if line < len(self.model) else None
+
+    def sort_by(self, column: str):
+        """Sort by a tree column; a second click on the same column reverses the order"""
+        key = self.sort_columns[column]
+        self.sort(key, self.model.sort_column == key and not self.model.sort_reverse)
+
+    def sort(self, key: Optional[str], reverse: bool = False):
+        """Sort the model by a catalog column (None for scan order) and redraw from the top"""
+        self.model.sort(key, reverse)
+        for name, heading in self.headings.items():
+            if name in self.sort_columns:
+                arrow = (" ▼" if reverse else " ▲") if key and self.sort_columns[name] == key else ""
+                self.tree.heading(name, text=heading + arrow)
+        self.offset = 0
+        self.last_clicked = None
+        self.refresh()
+
+    def _resize_pool(self, lines: int):
+        lines = max(1, lines)
+        while len(self.pool) < lines:
+            self.pool.append(self.tree.insert("", tk.END, text=""))
+        while len(self.pool) > lines:
+            self.tree.delete(self.pool.pop())
+
+    def _on_configure(self, event):
+        # Heading is about one row high
+        lines = max(1, event.height // self.row_height - 1)
+        if lines != self.visible_rows:
+            self._resize_pool(lines)
+            self.refresh()
+
+    def _scroll_by(self, rows: int):
+        self.offset += rows
+        self.refresh()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        return self._scroll_by(-3 * int(event.delta / 120) if abs(event.delta) >= 120 else -event.delta)
+
+    def _on_scrollbar(self, action: str, amount: str, unit: str = "units"):
+        if action == "moveto":
+            self.offset = int(float(amount) * len(self.model))
+            self.refresh()
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self._scroll_by(int(amount) * step)
+
+    def _on_click(self, event):
+        if self.tree.identify_column(event.x) != "#0":
+            return
+        line = self.line_at(event.y)
+        if line is None:
+            return
+        self.model.toggle(self.model.row_at_line(line))
+        self.last_clicked = line
+        self._changed()
+        return "break"
+
+    def _on_shift_click(self, event):
+        if self.tree.identify_column(event.x) != "#0":
+            return
+        line = self.line_at(event.y)
+        if line is None or self.last_clicked is None:
+            return
+        self.model.select_range(self.last_clicked, line)
+        self.last_clicked = line
+        self._changed()
+        return "break"
+
+    def _changed(self):
+        self.refresh()
+        if self.on_change:
+            self.on_change()
@@ -0,0 +1,251 @@
+import os
+import shutil
+import threading
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from transfer import SHELL_STAGING_FOLDER, PARTIAL_SUFFIX
+
+
+def size_matches(expected: int, actual: int, exact: bool = True) -> bool:
+    """Compare a device size with a file size
+
+    Sizes must be equal unless the device size is not exact: Shell sizes
+    come from display strings ("2.34 MB") and are rounded, so then up to
+    1% (at least 1 KB) of difference is accepted.
+    """
+    if expected <= 0:
+        return False
+    if exact:
+        return expected == actual
+    return abs(expected - actual) <= max(1024, expected // 100)
+
+
+@lru_cache(maxsize=8192)
+def destination_folder(date: str, sort_mode: str, base_path: str, unknown_path: str) -> Path:
+    """Map a record date (YYYY-MM-DD or "Unknown") to its destination folder
+
+    Memoized: a selection only has a few hundred distinct dates, so each
+    date is parsed and formatted once per run instead of once per photo.
+    """
+    try:
+        photo_date = datetime.strptime(date, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        # Unknown date - use unknown folder
+        return Path(unknown_path)
+
+    if sort_mode == "Month_Year":
+        # Format: YYYY-MM (e.g., 2024-01)
+        folder_name = photo_date.strftime("%Y-%m")
+    elif sort_mode == "Date_Month_Year":
+        # Format: YYYY-MM-DD (e.g., 2024-01-15)
+        folder_name = photo_date.strftime("%Y-%m-%d")
+    else:
+        folder_name = "Unknown"
+    return Path(base_path) / folder_name
+
+
+def create_folders(folders: Iterable[Path]) -> int:
+    """Create all destination folders of a plan in one pass; returns how many were created
+
+    Each distinct folder costs a single mkdir (sorted, so parents come
+    first) unless its parent is missing too.
+    """
+    created = 0
+    for folder in sorted(set(folders)):
+        try:
+            os.mkdir(folder)
+            created += 1
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            os.makedirs(folder, exist_ok=True)
+            created += 1
+    return created
+
+
+def clear_staging(roots: Iterable[str]) -> int:
+    """Remove the copies an interrupted import left under roots; returns how many
+
+    These are Shell staging folders and partial stream copies. Only
+    names and entry types are looked at (no stat per file), so this stays
+    cheap on a large library.
+    """
+    removed = 0
+    seen = set()
+    stack = [os.path.abspath(root) for root in roots if root]
+    while stack:
+        folder = stack.pop()
+        if os.path.normcase(folder) in seen:
+            # Unknown folder inside the output folder
+            continue
+        seen.add(os.path.normcase(folder))
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if not entry.is_dir(follow_symlinks=False):
+                            if entry.name.endswith(PARTIAL_SUFFIX):
+                                os.remove(entry.path)
+                                removed += 1
+                            continue
+                    except OSError:
+                        continue
+                    if entry.name == SHELL_STAGING_FOLDER:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        removed += 1
+                    else:
+                        stack.append(entry.path)
+        except OSError:
+            continue
+    return removed
+
+
+class DestinationIndex:
+    """In-memory index of the files already in the destination tree
+
+    Built once with os.scandir over the output roots and kept current by
+    add() as files land, so planning an import needs no disk access per
+    photo. Maps normalized folder -> lowercase name -> (name, size).
+    """
+
+    def __init__(self, roots: List[str]):
+        self.roots = [os.path.normcase(os.path.abspath(root)) for root in roots if root]
+        self.folders: Dict[str, Dict[str, Tuple[str, int]]] = {}
+        self.file_count = 0
+        self.version = 0  # Bumped on every change, so results derived from the index can be cached
+        self._lock = threading.Lock()
+
+    def covers(self, roots: List[str]) -> bool:
+        """Check whether this index was built for the given roots"""
+        return self.roots == [os.path.normcase(os.path.abspath(root)) for root in roots if root]
+
+    def build(self):
+        folders = {}
+        count = 0
+        stack = list(self.roots)
+        while stack:
+            folder = stack.pop()
+            if folder in folders:
+                # Unknown folder inside the output folder
+                continue
+            files = {}
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.name != SHELL_STAGING_FOLDER:
+                                    stack.append(os.path.normcase(entry.path))
+                            elif entry.is_file(follow_symlinks=False) and not entry.name.endswith(PARTIAL_SUFFIX):
+                                files[entry.name.lower()] = (entry.name, entry.stat().st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            folders[folder] = files
+            count += len(files)
+
+        with self._lock:
+            self.folders = folders
+            self.file_count = count
+            self.version += 1
+
+    def refresh_folder(self, folder: Path):
+        """Re-read one folder after it was found to be out of date"""
+        folder_key = os.path.normcase(os.path.abspath(folder))
+        files = {}
+        try:
+            with os.scandir(folder_key) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False) and not entry.name.endswith(PARTIAL_SUFFIX):
+                            files[entry.name.lower()] = (entry.name, entry.stat().st_size)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+
+        with self._lock:
+            self.file_count += len(files) - len(self.folders.get(folder_key, ()))
+            self.folders[folder_key] = files
+            self.version += 1
+
+    def add(self, path: Path, size: int):
+        """Record a file that just landed"""
+        folder, name = os.path.split(os.path.normcase(os.path.abspath(path)))
+        with self._lock:
+            files = self.folders.setdefault(folder, {})
+            if name.lower() not in files:
+                self.file_count += 1
+            files[name.lower()] = (os.path.basename(path), size)
+            self.version += 1
+
+    def folder_files(self, folder: Path) -> Dict[str, Tuple[str, int]]:
+        """Lowercase name -> (name, size) of the files indexed in folder"""
+        folder_key = os.path.normcase(os.path.abspath(folder))
+        with self._lock:
+            return dict(self.folders.get(folder_key, ()))
+
+    def find(self, folder: Path, filename: str, size: int, exact: bool = True) -> Optional[Path]:
+        """Return a file in folder with this name (or a keep_both rename of it) and size
+
+        With exact=False the size is a rounded one (see size_matches).
+        """
+        folder_key = os.path.normcase(os.path.abspath(folder))
+        with self._lock:
+            files = self.folders.get(folder_key)
+            existing_name = find_in_folder(files, filename, size, exact) if files else None
+        return Path(folder) / existing_name if existing_name else None
+
+
+def find_in_folder(files: Dict[str, Tuple[str, int]], filename: str, size: int, exact: bool = True) -> Optional[str]:
+    """Name of the file in a folder listing (see DestinationIndex.folder_files) that holds filename and size"""
+    # keep_both / skip_identical_content store clashes as name_1.ext,
+    # name_2.ext, ... using the first free number
+    stem, suffix = os.path.splitext(filename.lower())
+    candidate = filename.lower()
+    counter = 1
+    while candidate in files:
+        existing_name, existing_size = files[candidate]
+        if size_matches(size, existing_size, exact):
+            return existing_name
+        candidate = f"{stem}_{counter}{suffix}"
+        counter += 1
+    return None
+
+
+def plan_transfer(entries: List[Tuple[Dict, Path]], index: DestinationIndex,
+                  exact_sizes: bool = True) -> Tuple[List[Tuple[Dict, Path]], List[Tuple[Dict, Path]]]:
+    """Split (photo record, destination folder) pairs into (to copy, already present)
+
+    A photo is already present when its destination folder holds a file
+    with the same name and size (within rounding if the record sizes are
+    not exact_sizes). Hits are confirmed with a stat; if the folder
+    changed since it was indexed it is re-read and checked again.
+    """
+    to_copy = []
+    present = []
+    for photo_info, dest_folder in entries:
+        filename, size = photo_info['filename'], photo_info.get('size', 0)
+        existing = index.find(dest_folder, filename, size, exact_sizes)
+        if existing is not None and not _still_matches(existing, size, exact_sizes):
+            index.refresh_folder(dest_folder)
+            existing = index.find(dest_folder, filename, size, exact_sizes)
+            if existing is not None and not _still_matches(existing, size, exact_sizes):
+                existing = None
+
+        if existing is not None:
+            present.append((photo_info, existing))
+        else:
+            to_copy.append((photo_info, dest_folder))
+    return to_copy, present
+
+
+def _still_matches(path: Path, size: int, exact: bool) -> bool:
+    try:
+        return size_matches(size, os.stat(path).st_size, exact)
+    except OSError:
+        return False
@@ -0,0 +1,124 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def listing_signature(names: List[str]) -> str:
+    """Fingerprint of a folder listing (item count and names)"""
+    digest = hashlib.sha1(f"{len(names)}\n".encode('utf-8'))
+    for name in sorted(names):
+        digest.update(name.encode('utf-8', 'surrogatepass'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class ScanIndex:
+    """Persistent SQLite index of scanned photos, keyed by device identity
+
+    Stores, per device + storage, the listing signature of every folder
+    and the filename, folder, size and resolved date of every photo in
+    it. On a rescan, folders whose listing is unchanged are served from
+    the index instead of re-reading size/date for each file. deep_checked
+    marks dates already looked up in the file headers (deep date scan).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS folders (
+            device TEXT NOT NULL,
+            storage TEXT NOT NULL,
+            folder_path TEXT NOT NULL,
+            signature TEXT NOT NULL,
+            item_count INTEGER NOT NULL,
+            PRIMARY KEY (device, storage, folder_path)
+        );
+        CREATE TABLE IF NOT EXISTS photos (
+            device TEXT NOT NULL,
+            storage TEXT NOT NULL,
+            path TEXT NOT NULL,
+            folder_path TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            type TEXT NOT NULL,
+            deep_checked INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (device, storage, path)
+        );
+        CREATE INDEX IF NOT EXISTS photos_by_folder ON photos (device, storage, folder_path);
+    """
+
+    def __init__(self, db_path: str = "scan_index.db"):
+        self.db_path = Path(db_path)
+        # Scanner workers share one connection, serialized by the lock
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(self.SCHEMA)
+            # Indexes written before deep date scans existed
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(photos)")]
+            if 'deep_checked' not in columns:
+                self._conn.execute("ALTER TABLE photos ADD COLUMN deep_checked INTEGER NOT NULL DEFAULT 0")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def view(self, device: str, storage: str) -> 'ScanIndexView':
+        """Get the part of the index belonging to one device storage"""
+        return ScanIndexView(self, device, storage)
+
+    def get_folder(self, device: str, storage: str, folder_path: str,
+                   signature: str) -> Optional[Dict[str, Dict]]:
+        """Return cached records by path if the folder listing is unchanged"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT signature FROM folders WHERE device = ? AND storage = ? AND folder_path = ?",
+                (device, storage, folder_path)).fetchone()
+            if not row or row[0] != signature:
+                return None
+
+            rows = self._conn.execute(
+                "SELECT path, filename, size, date, type, deep_checked FROM photos "
+                "WHERE device = ? AND storage = ? AND folder_path = ?",
+                (device, storage, folder_path)).fetchall()
+
+        return {path: {'path': path, 'filename': filename, 'size': size, 'date': date, 'type': file_type,
+                       'deep_checked': bool(deep_checked)}
+                for path, filename, size, date, file_type, deep_checked in rows}
+
+    def save_folder(self, device: str, storage: str, folder_path: str, signature: str,
+                    item_count: int, records: List[Dict]):
+        """Replace the cached listing and photo records of a folder"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM photos WHERE device = ? AND storage = ? AND folder_path = ?",
+                    (device, storage, folder_path))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO photos "
+                    "(device, storage, path, folder_path, filename, size, date, type, deep_checked) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(device, storage, r['path'], folder_path, r['filename'], r['size'], r['date'], r['type'],
+                      int(r.get('deep_checked', False)))
+                     for r in records])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO folders (device, storage, folder_path, signature, item_count) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (device, storage, folder_path, signature, item_count))
+
+
+class ScanIndexView:
+    """ScanIndex bound to a single device + storage"""
+
+    def __init__(self, index: ScanIndex, device: str, storage: str):
+        self.index = index
+        self.device = device
+        self.storage = storage
+
+    def get_folder(self, folder_path: str, signature: str) -> Optional[Dict[str, Dict]]:
+        return self.index.get_folder(self.device, self.storage, folder_path, signature)
+
+    def save_folder(self, folder_path: str, signature: str, item_count: int, records: List[Dict]):
+        self.index.save_folder(self.device, self.storage, folder_path, signature, item_count, records)
@@ -0,0 +1,297 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from device_source import DeviceItem, DeviceSource, is_photo_file
+from log_sink import DEBUG, INFO, ERROR, print_log
+from media_dates import read_stream_date
+from scan_index import ScanIndexView, listing_signature
+
+
+# Read-ahead of device streams opened for a deep date lookup
+DEEP_BUFFER_SIZE = 16 * 1024
+
+
+def date_from_name(filename: str, folder_name: str) -> str:
+    """Guess a YYYY-MM-DD date from the filename or its folder name"""
+    # Fallback 1: Extract date from filename
+    try:
+        if filename.startswith("IMG_") or filename.startswith("VID_"):
+            parts = filename.split("_")
+            if len(parts) >= 2:
+                date_part = parts[1].replace("E", "")  # Remove E from IMG_E prefix
+                if len(date_part) >= 8 and date_part[:8].isdigit():
+                    year = date_part[:4]
+                    month = date_part[4:6]
+                    day = date_part[6:8]
+                    return f"{year}-{month}-{day}"
+    except:
+        pass
+
+    # Fallback 2: Extract date from parent folder name (e.g., 202512__, 202410__)
+    try:
+        # Check if folder name starts with YYYYMM format
+        if folder_name and len(folder_name) >= 6 and folder_name[:6].isdigit():
+            year = folder_name[:4]
+            month = folder_name[4:6]
+            # Use first day of month as default
+            return f"{year}-{month}-01"
+    except:
+        pass
+
+    return "Unknown"
+
+
+class PhotoScanner:
+    """Walks a device storage once and collects photo items
+
+    The access strategy (GetFolder, Items(), path-based NameSpace for the
+    Shell source) is probed once on the storage root and then reused for
+    the whole walk. Items are deduplicated by device path.
+
+    Folders are walked breadth-first by a bounded pool of worker threads,
+    each with its own COM apartment (DeviceSource.thread_init), so sibling
+    folders like 100APPLE, 101APPLE and 202410__ are listed concurrently.
+    Per-folder latency over MTP, not CPU, dominates scan time.
+
+    With a ScanIndexView, folders whose listing matches the previous scan
+    reuse the stored size/date instead of reading them from the device.
+
+    With deep_dates, every batch of records additionally gets its date
+    from the EXIF/QuickTime headers of the file, read over a device
+    stream by a pool of deep_workers threads with at most deep_budget
+    bytes per file. Deep dates are saved in the index, so each file is
+    only read once.
+    """
+
+    def __init__(self, source: DeviceSource, log: Callable[..., None] = print_log,
+                 max_depth: int = 4, workers: int = 4, batch_size: int = 50,
+                 index: Optional[ScanIndexView] = None, deep_dates: bool = False,
+                 deep_budget: int = 256 * 1024, deep_workers: int = 4):
+        self.source = source
+        self.index = index
+        self.log = log
+        self.max_depth = max_depth
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.deep_dates = deep_dates
+        self.deep_budget = deep_budget
+        self.deep_workers = max(1, deep_workers)
+        self.strategy = None
+        self._deep_pool = None
+
+    def probe_strategy(self, storage: DeviceItem) -> Tuple[Optional[str], List[DeviceItem]]:
+        """Find the first access strategy that can list the storage root"""
+        for method, strategy in enumerate(self.source.STRATEGIES, 1):
+            try:
+                self.log(f"Method {method}: Trying {strategy}...")
+                items = self.source.list_folder(storage, strategy)
+            except Exception as e:
+                self.log(f"{strategy} failed: {e}")
+                continue
+
+            if items:
+                self.log(f"Using {strategy}: found {len(items)} folders/files")
+                return strategy, items
+            self.log(f"{strategy} returned no items")
+
+        return None, []
+
+    def make_record(self, item: DeviceItem) -> Dict:
+        """Build the photo record (size, date, type) for a photo item"""
+        filename = item.name
+
+        # Get file type
+        file_ext = filename.split('.')[-1].upper() if '.' in filename else 'Unknown'
+
+        # Get file size and date from the device
+        stat = self.source.stat(item)
+        date_str = stat['date'].strftime("%Y-%m-%d") if stat['date'] else "Unknown"
+        if date_str == "Unknown":
+            date_str = date_from_name(filename, item.folder_name)
+
+        return {
+            'path': item.path,
+            'item': item,
+            'filename': filename,
+            'date': date_str,
+            'size': stat['size'],
+            'type': file_ext,
+            'deep_checked': False
+        }
+
+    def deep_date(self, record: Dict) -> Dict:
+        """Replace the record's date with the capture date from the file headers"""
+        try:
+            with self.source.open_stream(record['item'], buffer_size=DEEP_BUFFER_SIZE) as f:
+                media_date = read_stream_date(f, self.deep_budget)
+        except Exception:
+            media_date = None
+        if media_date:
+            record['date'] = media_date.strftime("%Y-%m-%d")
+        record['deep_checked'] = True
+        return record
+
+    def _with_deep_dates(self, records: List[Dict]) -> List[Dict]:
+        """Resolve deep dates of a batch in parallel (no-op unless enabled)"""
+        if self._deep_pool is not None:
+            todo = [record for record in records if not record.get('deep_checked')]
+            list(self._deep_pool.map(self.deep_date, todo))
+        return records
+
+    def iter_photos(self, storage: DeviceItem) -> Iterator[Dict]:
+        """Yield photo records as the storage is walked"""
+        self.strategy, top_items = self.probe_strategy(storage)
+        if self.strategy is None:
+            return
+        yield from self.walk(top_items)
+
+    def walk(self, top_items: List[DeviceItem]) -> Iterator[Dict]:
+        """Yield photo records below top_items, listing folders in parallel
+
+        Workers pull folders from a shared work queue, push subfolders
+        back onto it, build records for the photos they find and send
+        them and log lines to a results queue that is drained here, on
+        the calling thread. Logging only ever happens on the calling
+        thread.
+        """
+        work = queue.Queue()
+        results = queue.Queue()
+        stop = threading.Event()
+        lock = threading.Lock()
+        seen = set()
+        pending = [0]  # Folders queued or being listed
+
+        def claim(item: DeviceItem) -> bool:
+            with lock:
+                if item.path in seen:
+                    return False
+                seen.add(item.path)
+                return True
+
+        def submit(folder: DeviceItem, depth: int):
+            with lock:
+                pending[0] += 1
+            work.put((folder, depth))
+
+        def worker():
+            self.source.thread_init()
+            try:
+                while True:
+                    task = work.get()
+                    if task is None:
+                        break
+                    folder, depth = task
+                    try:
+                        if not stop.is_set():
+                            self._list_folder(folder, depth, claim, submit, results)
+                    except Exception as e:
+                        results.put(('log', (f"Error scanning folder {folder.name}: {e}", ERROR)))
+                    finally:
+                        with lock:
+                            pending[0] -= 1
+                            finished = pending[0] == 0
+                        if finished:
+                            results.put(('done', None))
+            finally:
+                self.source.thread_uninit()
+
+        top_photos = []
+        for item in top_items:
+            if not claim(item):
+                continue
+            if item.is_folder:
+                submit(item, 0)
+            elif is_photo_file(item.name):
+                top_photos.append(item)
+
+        if self.deep_dates:
+            # COM apartments of pool threads end with the threads
+            self._deep_pool = ThreadPoolExecutor(max_workers=self.deep_workers,
+                                                 initializer=self.source.thread_init)
+        try:
+            for item in top_photos:
+                try:
+                    yield self._with_deep_dates([self.make_record(item)])[0]
+                except Exception as e:
+                    self.log(f"Error loading metadata for {item.name}: {e}", level=ERROR)
+            if pending[0] == 0:
+                return
+
+            threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.workers)]
+            for thread in threads:
+                thread.start()
+
+            try:
+                while True:
+                    kind, payload = results.get()
+                    if kind == 'done':
+                        break
+                    elif kind == 'log':
+                        self.log(*payload)
+                    else:
+                        yield from payload
+            finally:
+                stop.set()
+                for _ in threads:
+                    work.put(None)
+        finally:
+            if self._deep_pool is not None:
+                self._deep_pool.shutdown(wait=False)
+                self._deep_pool = None
+
+    def _list_folder(self, folder: DeviceItem, depth: int, claim, submit, results: queue.Queue):
+        """List one folder with the probed strategy (runs on a worker)"""
+        indent = '  ' * depth
+        level = DEBUG if depth else INFO  # Subfolders are detail
+        if depth > self.max_depth:  # Prevent infinite recursion
+            results.put(('log', (f"{indent}Max depth reached at: {folder.name}", level)))
+            return
+
+        results.put(('log', (f"{indent}Accessing: {folder.name}", level)))
+        items = self.source.list_folder(folder, self.strategy)
+
+        cached = None
+        if self.index is not None:
+            signature = listing_signature([item.name for item in items])
+            cached = self.index.get_folder(folder.path, signature)
+
+        # Cached records from a scan without deep dates still need them
+        refresh = cached is not None and self.deep_dates and \
+            not all(record['deep_checked'] for record in cached.values())
+
+        if cached is not None:
+            results.put(('log', (f"{indent}Found {len(items)} items in {folder.name} (unchanged, using index)", level)))
+        else:
+            results.put(('log', (f"{indent}Found {len(items)} items in {folder.name}", level)))
+
+        photos = []
+        folder_records = []
+        for item in items:
+            if not claim(item):
+                continue
+            if item.is_folder:
+                submit(item, depth + 1)
+            elif is_photo_file(item.name):
+                try:
+                    if cached is not None and item.path in cached:
+                        record = dict(cached[item.path], item=item)
+                    else:
+                        record = self.make_record(item)
+                    photos.append(record)
+                    folder_records.append(record)
+                except Exception as e:
+                    results.put(('log', (f"{indent}  Error loading metadata for {item.name}: {e}", ERROR)))
+
+                # Hand records over in small batches so they show up while
+                # the rest of a large folder is still being read
+                if len(photos) >= self.batch_size:
+                    results.put(('photos', self._with_deep_dates(photos)))
+                    photos = []
+
+        if photos:
+            results.put(('photos', self._with_deep_dates(photos)))
+
+        if self.index is not None and (cached is None or refresh):
+            self.index.save_folder(folder.path, signature, len(items), folder_records)
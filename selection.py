@@ -0,0 +1,139 @@
+from typing import List
+
+
+# Per-byte lookup tables for bytes.translate: set bits in a byte, and the byte inverted
+_POPCOUNT = bytes(bin(value).count("1") for value in range(256))
+_INVERT = bytes(255 - value for value in range(256))
+_DIGITS = b"0" + b"1" * 255  # Flag byte -> binary digit
+_FLAGS = bytes(value == ord("1") for value in range(256))  # Binary digit -> flag byte
+_BIT_POSITIONS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def popcount(data: bytes) -> int:
+    """Number of set bits in data"""
+    return sum(data.translate(_POPCOUNT))
+
+
+class SelectionSet:
+    """Set of selected rows stored as one bit per row
+
+    Bit i is bit (i % 8) of byte i // 8. The number of selected rows is
+    kept up to date, so counting is free; ranges are written a whole byte
+    at a time with slice assignment, and invert/popcount run through
+    bytes.translate, so even 100k-row operations stay well within a frame.
+    """
+
+    __slots__ = ('bits', 'size', 'count')
+
+    def __init__(self, size: int = 0):
+        self.bits = bytearray((size + 7) // 8)
+        self.size = size
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, row: int) -> bool:
+        return bool(self.bits[row >> 3] >> (row & 7) & 1)
+
+    def append(self, selected: bool = False):
+        """Add a row at the end"""
+        if self.size & 7 == 0:
+            self.bits.append(0)
+        self.size += 1
+        if selected:
+            self.set(self.size - 1, True)
+
+    def clear(self):
+        """Remove all rows"""
+        self.bits = bytearray()
+        self.size = 0
+        self.count = 0
+
+    def set(self, row: int, selected: bool):
+        if not 0 <= row < self.size:
+            raise IndexError(row)
+        index, mask = row >> 3, 1 << (row & 7)
+        current = self.bits[index] & mask
+        if selected and not current:
+            self.bits[index] |= mask
+            self.count += 1
+        elif current and not selected:
+            self.bits[index] &= ~mask & 0xFF
+            self.count -= 1
+
+    def toggle(self, row: int):
+        self.set(row, row not in self)
+
+    def set_range(self, start: int, stop: int, selected: bool = True):
+        """Select (or unselect) rows start <= row < stop"""
+        start, stop = max(0, start), min(stop, self.size)
+        if start >= stop:
+            return
+        first, last = start >> 3, (stop - 1) >> 3
+        before = popcount(self.bits[first:last + 1])
+
+        head = (0xFF << (start & 7)) & 0xFF
+        tail = (1 << (((stop - 1) & 7) + 1)) - 1
+        if first == last:
+            self._apply(first, head & tail, selected)
+        else:
+            self._apply(first, head, selected)
+            self.bits[first + 1:last] = (b'\xff' if selected else b'\x00') * (last - first - 1)
+            self._apply(last, tail, selected)
+
+        self.count += popcount(self.bits[first:last + 1]) - before
+
+    def set_all(self, selected: bool = True):
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+        if selected:
+            self.set_range(0, self.size, True)
+
+    def invert(self):
+        """Select the unselected rows and unselect the selected ones"""
+        self.bits = self.bits.translate(_INVERT)
+        if self.size & 7:
+            # Bits past the last row stay clear
+            self.bits[-1] &= (1 << (self.size & 7)) - 1
+        self.count = self.size - self.count
+
+    def set_flags(self, flags: bytes, selected: bool = True):
+        """Select (or unselect) every row whose byte in flags is non-zero
+
+        flags has one byte per row (as PhotoCatalog.match returns). The
+        flags are read as one big binary number, so the whole set is
+        updated with a single OR (or AND NOT).
+        """
+        if len(flags) != self.size:
+            raise ValueError(f"expected {self.size} flags, got {len(flags)}")
+        if not flags:
+            return
+        # Row 0 is the lowest bit, so the digits are written last row first
+        mask = int(flags.translate(_DIGITS)[::-1], 2)
+        current = int.from_bytes(self.bits, 'little')
+        current = current | mask if selected else current & ~mask
+        self.bits = bytearray(current.to_bytes(len(self.bits), 'little'))
+        self.count = popcount(self.bits)
+
+    def flags(self) -> bytes:
+        """One byte per row, 1 where the row is selected (the inverse of set_flags)"""
+        if not self.size:
+            return b""
+        digits = bin(int.from_bytes(self.bits, 'little'))[2:].zfill(self.size)
+        return digits[::-1].encode('ascii').translate(_FLAGS)
+
+    def rows(self) -> List[int]:
+        """Selected rows in ascending order"""
+        rows = []
+        for index, value in enumerate(self.bits):
+            if value:
+                base = index << 3
+                rows.extend(base + bit for bit in _BIT_POSITIONS[value])
+        return rows
+
+    def _apply(self, index: int, mask: int, selected: bool):
+        if selected:
+            self.bits[index] |= mask
+        else:
+            self.bits[index] &= ~mask & 0xFF
@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from engine import ImportEngine, ImportJob, default_settings, find_storage, prepare_resume, scan_photos
+from device_source import LocalDeviceSource
+from journal import COPIED, VERIFIED, load_last_run, unfinished_files
+from timestamps import WINDOWS_SUPPORT, TimestampBatch, set_file_times, set_open_file_times
+
+
+TAKEN = datetime(2021, 6, 15, 10, 30, 0)
+
+
+@unittest.skipIf(WINDOWS_SUPPORT, "checks the os.utime path")
+class LocalTimesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_set_file_times(self):
+        path = self.folder / "IMG_0001.HEIC"
+        path.write_bytes(b"data")
+        set_file_times(path, TAKEN)
+        self.assertEqual(os.stat(path).st_mtime, TAKEN.timestamp())
+
+    def test_set_open_file_times_survives_close(self):
+        path = self.folder / "IMG_0002.HEIC"
+        with open(path, 'wb') as f:
+            f.write(b"data")
+            set_open_file_times(f, TAKEN)
+        self.assertEqual(os.stat(path).st_mtime, TAKEN.timestamp())
+
+    def test_batch_reports_updated_and_failed(self):
+        present = self.folder / "IMG_0003.HEIC"
+        present.write_bytes(b"data")
+        missing = self.folder / "IMG_0004.HEIC"
+        batch = TimestampBatch()
+        batch.add(present, TAKEN)
+        batch.add(missing, TAKEN)
+
+        updated, failed = batch.apply()
+        self.assertEqual(updated, [present])
+        self.assertEqual([path for path, _ in failed], [missing])
+        self.assertEqual(len(batch), 0)
+        self.assertEqual(os.stat(present).st_mtime, TAKEN.timestamp())
+
+
+@unittest.skipIf(WINDOWS_SUPPORT, "checks the os.utime path")
+class ShellCopyJournalTest(unittest.TestCase):
+    """Shell copies are only journaled verified once their times are set"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        dcim = root / "device" / "Internal Storage" / "DCIM" / "100APPLE"
+        dcim.mkdir(parents=True)
+        for n in range(3):
+            path = dcim / f"IMG_000{n}.JPG"
+            path.write_bytes(b"x" * 100)
+            os.utime(path, (TAKEN.timestamp(), TAKEN.timestamp()))
+
+        self.settings = default_settings()
+        self.settings.update(output_base_path=str(root / "out"), unknown_folder_path=str(root / "out" / "Unknown"),
+                             copy_method="shell", use_scan_index=False)
+        self.source = LocalDeviceSource(str(root / "device"))
+        storage = find_storage(self.source.list_storages(), log=lambda message, level=None: None)
+        self.records = list(scan_photos(self.source, storage, self.settings, log=lambda message, level=None: None))
+
+        self.cwd = os.getcwd()
+        os.chdir(root)  # The journal is written to the working directory
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_run_verifies_after_stamping(self):
+        summary = ImportEngine(log=lambda message, level=None: None).run(ImportJob.create(self.source, self.records, self.settings))
+        self.assertEqual(summary['moved'], 3)
+
+        run = load_last_run(Path("transfer_journal.jsonl"))
+        self.assertEqual(unfinished_files(run), {})
+        for entry in run['files'].values():
+            self.assertEqual(entry['state'], VERIFIED)
+            self.assertEqual(os.stat(entry['dest']).st_mtime, TAKEN.timestamp())
+
+    def test_resume_sets_unapplied_times(self):
+        engine = ImportEngine(log=lambda message, level=None: None)
+        engine.timestamp_batch.apply = lambda: ([], [])  # Stop before the batch runs
+        engine.run(ImportJob.create(self.source, self.records, self.settings))
+
+        run = load_last_run(Path("transfer_journal.jsonl"))
+        pending = unfinished_files(run)
+        self.assertEqual({entry['state'] for entry in pending.values()}, {COPIED})
+        for entry in pending.values():
+            os.utime(entry['dest'], (0, 0))
+
+        records_by_path = {record['path']: record for record in self.records}
+        records, missing, stamped = prepare_resume(pending, records_by_path, log=lambda message, level=None: None)
+        self.assertEqual((records, missing, len(stamped)), ([], 0, 3))
+        for entry in pending.values():
+            self.assertEqual(os.stat(entry['dest']).st_mtime, TAKEN.timestamp())
+
+        ImportEngine(log=lambda message, level=None: None).run(
+            ImportJob.create(self.source, records, self.settings, run['run'], stamped))
+        self.assertEqual(unfinished_files(load_last_run(Path("transfer_journal.jsonl"))), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import msvcrt
+    import pywintypes
+    import win32file
+    WINDOWS_SUPPORT = True
+except ImportError:
+    WINDOWS_SUPPORT = False
+
+
+def set_file_times(path: Path, created: datetime, modified: Optional[datetime] = None):
+    """Set the creation and modification time of a closed file
+
+    On Windows both are set with SetFileTime; elsewhere only the
+    modification (and access) time can be set, with os.utime.
+    """
+    modified = modified or created
+    if WINDOWS_SUPPORT:
+        handle = win32file.CreateFile(str(path), win32file.GENERIC_WRITE, 0, None,
+                                      win32file.OPEN_EXISTING, 0, None)
+        try:
+            win32file.SetFileTime(handle, pywintypes.Time(created), None, pywintypes.Time(modified))
+        finally:
+            win32file.CloseHandle(handle)
+    else:
+        timestamp = modified.timestamp()
+        os.utime(path, (timestamp, timestamp))
+
+
+def set_open_file_times(f, created: datetime, modified: Optional[datetime] = None):
+    """Set the times of a file through the handle that is writing it
+
+    Saves reopening the file after the copy. Nothing may be written to f
+    afterwards, or the modification time moves again.
+    """
+    modified = modified or created
+    f.flush()
+    if WINDOWS_SUPPORT:
+        handle = msvcrt.get_osfhandle(f.fileno())
+        win32file.SetFileTime(handle, pywintypes.Time(created), None, pywintypes.Time(modified))
+    elif os.utime in os.supports_fd:
+        timestamp = modified.timestamp()
+        os.utime(f.fileno(), (timestamp, timestamp))
+    else:
+        set_file_times(f.name, created, modified)
+
+
+class TimestampBatch:
+    """Timestamp updates collected during a run and applied together at the end
+
+    Used for files written by someone else (the Shell copy engine), which
+    have no handle of ours to set times on while they are written.
+    """
+
+    def __init__(self):
+        self.pending: List[Tuple[Path, datetime, datetime]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, path: Path, created: datetime, modified: Optional[datetime] = None):
+        with self._lock:
+            self.pending.append((Path(path), created, modified or created))
+
+    def apply(self) -> Tuple[List[Path], List[Tuple[Path, str]]]:
+        """Set all pending times; returns (updated paths, [(path, error)])"""
+        with self._lock:
+            pending, self.pending = self.pending, []
+
+        updated = []
+        failed = []
+        for path, created, modified in pending:
+            try:
+                set_file_times(path, created, modified)
+                updated.append(path)
+            except Exception as e:
+                failed.append((path, str(e)))
+        return updated, failed
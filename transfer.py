@@ -0,0 +1,385 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import win32con
+    import win32event
+    import win32file
+    import pywintypes
+    WINDOWS_SUPPORT = True
+except ImportError:
+    WINDOWS_SUPPORT = False
+
+
+# Per-file states tracked by TransferProgress
+QUEUED = "queued"
+ACTIVE = "active"
+MOVED = "moved"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+# Folder (inside each destination folder) that Shell copies are written to
+# before being moved into place; walks of the library skip it
+SHELL_STAGING_FOLDER = ".import_staging"
+
+# Suffix of a stream copy while it is being written; walks of the
+# library skip these files too
+PARTIAL_SUFFIX = ".import_partial"
+
+
+class CopyJob:
+    """One file to transfer"""
+
+    __slots__ = ('index', 'key', 'size', 'payload', 'state', 'error', 'bytes_done', 'started', 'finished', 'dest')
+
+    def __init__(self, index: int, key, size: int, payload):
+        self.index = index          # 1-based position in the run (for [idx/total] logs)
+        self.key = key              # Jobs sharing a key never run at the same time
+        self.size = size            # Expected size in bytes (0 if unknown)
+        self.payload = payload      # Whatever the worker function needs (photo record)
+        self.state = QUEUED
+        self.error = ""
+        self.bytes_done = 0
+        self.started = 0.0
+        self.finished = 0.0
+        self.dest = None            # File written, once the worker knows it
+
+
+class TransferProgress:
+    """Thread-safe per-file completion tracking and global aggregate"""
+
+    def __init__(self, jobs: List[CopyJob]):
+        self.jobs = jobs
+        self.total_files = len(jobs)
+        self.total_bytes = sum(job.size for job in jobs)
+        self.counts = {QUEUED: len(jobs), ACTIVE: 0, MOVED: 0, SKIPPED: 0, FAILED: 0}
+        self.bytes_done = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def set_state(self, job: CopyJob, state: str, nbytes: int = 0, error: str = ""):
+        with self._lock:
+            self.counts[job.state] -= 1
+            self.counts[state] += 1
+            job.state = state
+            if state == ACTIVE:
+                job.started = time.perf_counter()
+            elif state in (MOVED, SKIPPED, FAILED):
+                job.finished = time.perf_counter()
+                self.bytes_done += nbytes - job.bytes_done
+                job.bytes_done = nbytes
+                job.error = error
+
+    def update_bytes(self, job: CopyJob, nbytes: int):
+        """Record bytes written so far for an in-flight job"""
+        with self._lock:
+            self.bytes_done += nbytes - job.bytes_done
+            job.bytes_done = nbytes
+
+    @property
+    def files_done(self) -> int:
+        return self.counts[MOVED] + self.counts[SKIPPED] + self.counts[FAILED]
+
+    def snapshot(self) -> Dict:
+        """Consistent copy of the aggregate counters"""
+        with self._lock:
+            elapsed = time.perf_counter() - self.started
+            return {
+                'total_files': self.total_files,
+                'files_done': self.files_done,
+                'moved': self.counts[MOVED],
+                'skipped': self.counts[SKIPPED],
+                'failed': self.counts[FAILED],
+                'active': self.counts[ACTIVE],
+                'total_bytes': self.total_bytes,
+                'bytes_done': self.bytes_done,
+                'elapsed': elapsed,
+                'bytes_per_second': self.bytes_done / elapsed if elapsed > 0 else 0.0,
+            }
+
+
+# Transfers in flight when an auto-tuned run starts; the climb goes up from here
+AUTO_TUNE_START = 2
+
+
+class CopyScheduler:
+    """Keeps up to N transfers in flight and tunes N from observed throughput
+
+    A fixed pool of max_workers threads is started; at most `limit` of
+    them run a transfer at once. With auto_tune, `limit` starts low
+    (initial, by default AUTO_TUNE_START) and is hill-climbed every
+    tune_interval seconds: if bytes/s improved since the previous window
+    the last step is repeated, otherwise (or at 1 or max_workers) it is
+    reversed. Without auto_tune, `limit` is max_workers.
+
+    worker(job, progress) performs one transfer and returns
+    (state, bytes, error) where state is MOVED, SKIPPED or FAILED.
+    on_done(job, progress), if given, runs on the worker thread once the
+    job's outcome is counted.
+    """
+
+    def __init__(self, worker: Callable[[CopyJob, TransferProgress], Tuple[str, int, str]], max_workers: int = 4,
+                 initial: Optional[int] = None, auto_tune: bool = True, tune_interval: float = 5.0,
+                 thread_init: Callable[[], None] = None, thread_uninit: Callable[[], None] = None,
+                 on_done: Callable[[CopyJob, TransferProgress], None] = None):
+        self.worker = worker
+        self.max_workers = max(1, max_workers)
+        if initial is None:
+            initial = AUTO_TUNE_START if auto_tune else self.max_workers
+        self.limit = max(1, min(initial, self.max_workers))
+        self.auto_tune = auto_tune
+        self.tune_interval = tune_interval
+        self.thread_init = thread_init
+        self.thread_uninit = thread_uninit
+        self.on_done = on_done
+        self.progress = None
+
+        self._cond = threading.Condition()
+        self._pending = []
+        self._active = 0
+        self._busy_keys = set()
+        self._cancelled = False
+
+        # Auto-tune state
+        self._window_start = 0.0
+        self._window_bytes = 0
+        self._last_rate = None
+        self._step = 1
+
+    def cancel(self):
+        """Stop starting new transfers; running ones finish"""
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+
+    def run(self, jobs: List[CopyJob]) -> TransferProgress:
+        """Transfer all jobs and block until they are done"""
+        self.progress = TransferProgress(jobs)
+        self._pending = list(jobs)
+        self._window_start = time.perf_counter()
+
+        threads = [threading.Thread(target=self._worker_loop, daemon=True)
+                   for _ in range(min(self.max_workers, len(jobs)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.progress
+
+    def _next_job(self) -> Optional[CopyJob]:
+        """Wait for a free slot and claim the first job whose key is idle"""
+        with self._cond:
+            while True:
+                if self._cancelled or not self._pending:
+                    return None
+                if self._active < self.limit:
+                    for i, job in enumerate(self._pending):
+                        if job.key not in self._busy_keys:
+                            del self._pending[i]
+                            self._busy_keys.add(job.key)
+                            self._active += 1
+                            return job
+                self._cond.wait(0.5)
+
+    def _worker_loop(self):
+        if self.thread_init:
+            self.thread_init()
+        try:
+            while True:
+                job = self._next_job()
+                if job is None:
+                    break
+
+                self.progress.set_state(job, ACTIVE)
+                try:
+                    state, nbytes, error = self.worker(job, self.progress)
+                except Exception as e:
+                    state, nbytes, error = FAILED, 0, str(e)
+                self.progress.set_state(job, state, nbytes, error)
+                if self.on_done:
+                    self.on_done(job, self.progress)
+
+                with self._cond:
+                    self._active -= 1
+                    self._busy_keys.discard(job.key)
+                    self._window_bytes += nbytes
+                    if self.auto_tune:
+                        self._tune()
+                    self._cond.notify_all()
+        finally:
+            if self.thread_uninit:
+                self.thread_uninit()
+
+    def _tune(self):
+        """Hill-climb the concurrency limit on bytes/s (called under lock)"""
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed < self.tune_interval:
+            return
+
+        rate = self._window_bytes / elapsed
+        if self._last_rate is not None and rate < self._last_rate:
+            self._step = -self._step
+        self._last_rate = rate
+        limit = max(1, min(self.max_workers, self.limit + self._step))
+        if limit == self.limit:
+            # At a bound: probe the other way next time
+            self._step = -self._step
+        self.limit = limit
+
+        self._window_start = now
+        self._window_bytes = 0
+
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def partial_path(dest_path: Path) -> Path:
+    """Name a stream copy is written under until it replaces dest_path"""
+    return dest_path.with_name(dest_path.name + PARTIAL_SUFFIX)
+
+
+def copy_stream(src, dest_path: Path, chunk_size: int = COPY_CHUNK_SIZE,
+                on_progress: Callable[[int], None] = None, finish: Callable[[object], None] = None) -> int:
+    """Copy a readable binary stream to dest_path in large chunks
+
+    Returns the number of bytes written. The bytes go to
+    partial_path(dest_path), which replaces dest_path only once the copy
+    and finish succeed, so a failed copy leaves an existing file as it
+    was. finish(out) runs with the copy still open (readable and
+    writable), e.g. to set its timestamps on the same handle.
+    """
+    partial = partial_path(dest_path)
+    written = 0
+    try:
+        with open(partial, 'w+b', buffering=0) as out:
+            buffer = bytearray(chunk_size)
+            view = memoryview(buffer)
+            while True:
+                n = src.readinto(buffer)
+                if not n:
+                    break
+                chunk = view[:n]
+                while chunk:
+                    # Unbuffered writes may be short
+                    chunk = chunk[out.write(chunk):]
+                written += n
+                if on_progress:
+                    on_progress(written)
+            if finish:
+                finish(out)
+        os.replace(partial, dest_path)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    return written
+
+
+class _ChangeNotification:
+    """Wakes up on size/name/write changes in a folder (Windows only)"""
+
+    def __init__(self, folder: Path):
+        notify_filter = (win32con.FILE_NOTIFY_CHANGE_FILE_NAME | win32con.FILE_NOTIFY_CHANGE_SIZE |
+                         win32con.FILE_NOTIFY_CHANGE_LAST_WRITE)
+        self.handle = win32file.FindFirstChangeNotification(str(folder), False, notify_filter)
+
+    def wait(self, seconds: float) -> bool:
+        """Wait up to seconds for a change; True if something changed"""
+        result = win32event.WaitForSingleObject(self.handle, int(seconds * 1000))
+        if result == win32event.WAIT_OBJECT_0:
+            win32file.FindNextChangeNotification(self.handle)
+            return True
+        return False
+
+    def close(self):
+        win32file.FindCloseChangeNotification(self.handle)
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return -1
+
+
+def _is_locked(path: Path) -> bool:
+    """Check if another process (e.g. the Shell copy engine) still has the file open for writing"""
+    if not WINDOWS_SUPPORT:
+        return False
+    try:
+        handle = win32file.CreateFile(str(path), win32file.GENERIC_READ, win32file.FILE_SHARE_READ,
+                                      None, win32file.OPEN_EXISTING, 0, None)
+    except pywintypes.error:
+        return True
+    win32file.CloseHandle(handle)
+    return False
+
+
+def wait_for_copy(path: Path, expected_size: int = 0, timeout: float = 120.0, settle: float = 0.5,
+                  on_wait: Callable[[float], None] = None) -> int:
+    """Wait until a file being written by someone else is complete; returns its size
+
+    Complete means the file reached expected_size exactly or its size
+    stopped changing for `settle` seconds, and nobody holds it open for
+    writing any more. On Windows the wait reacts to change notifications
+    on the destination folder; elsewhere it polls with a short, growing
+    back-off (50 ms up to 1 s). Raises TimeoutError when the file has not
+    changed for `timeout` seconds.
+    """
+    start = time.perf_counter()
+    delay = 0.05
+    last_size = -1
+    last_change = start
+    next_report = start + 10
+
+    watcher = None
+    if WINDOWS_SUPPORT:
+        try:
+            watcher = _ChangeNotification(Path(path).parent)
+        except Exception:
+            watcher = None
+
+    try:
+        while True:
+            now = time.perf_counter()
+            size = _file_size(path)
+
+            if size != last_size:
+                last_size = size
+                last_change = now
+                delay = 0.05
+
+            if size > 0:
+                reached = size == expected_size or now - last_change >= settle
+                if reached and not _is_locked(path):
+                    return size
+
+            deadline = last_change + timeout
+            if now >= deadline:
+                raise TimeoutError(f"Timeout after {timeout:.0f}s - file may still be copying")
+
+            if on_wait and now >= next_report:
+                on_wait(now - start)
+                next_report = now + 10
+
+            # With change notifications any write wakes us up, so only the
+            # settle deadline needs a timer; without them, back off
+            wait = 1.0 if watcher else delay
+            if size > 0:
+                # Come back exactly when the size would count as settled
+                wait = min(wait, max(settle - (now - last_change), 0.01))
+            wait = min(wait, max(deadline - now, 0.01))
+            if watcher:
+                watcher.wait(wait)
+            else:
+                time.sleep(wait)
+                delay = min(delay * 2, 1.0)
+    finally:
+        if watcher:
+            watcher.close()